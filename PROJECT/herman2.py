@@ -1,74 +1,1883 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk, ImageEnhance
+from PIL import Image, ImageTk, ImageStat
 import requests
-from io import BytesIO
 import math
 import threading
 import os
 from datetime import datetime
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+import hashlib
+import json
+import tempfile
+import heapq
+import itertools
+import random
+import sys
+import argparse
+import urllib3
+import mmap
+import struct
+import shutil
+import io
+from functools import partial
+import bisect
+
+# --- Download config ---
+MAX_CONCURRENT_DOWNLOADS = 6   # global worker pool size
+MAX_DOWNLOADS_PER_HOST = 4     # simultaneous requests against a single host
+DOWNLOAD_CONNECT_TIMEOUT = 10  # seconds to establish a connection
+DOWNLOAD_READ_TIMEOUT = 30     # seconds of silence from the server mid-transfer
+HTTP_POOL_HOSTS = 4            # hosts with a pooled keep-alive connection set
+HTTP_POOL_SIZE = MAX_CONCURRENT_DOWNLOADS  # connections kept alive per host
+DOWNLOAD_RETRIES = 3           # attempts per download before it is reported as failed
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+PROGRESS_INTERVAL = 0.1        # seconds between byte-level progress reports per download
+USER_AGENT = 'Mozilla/5.0'
+BACKGROUND_PRELOAD = True      # False: only fetch windows the user hovers or opens
+
+# --- Retry config ---
+RETRY_BASE_DELAY = 1.0         # seconds before the first retry, doubled on every further attempt
+RETRY_MAX_DELAY = 30.0
+RETRY_JITTER = 0.5             # each delay is randomly shortened by up to this fraction
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+BREAKER_THRESHOLD = 5          # consecutive retryable failures before a host is left alone
+BREAKER_COOLDOWN = 30.0        # seconds a tripped host is left alone
+AUTO_RETRY_FAILED = True       # retry transient failures in the background without waiting for F5
+AUTO_RETRY_DELAY = 60.0        # seconds before the first automatic round, doubled for each later one
+AUTO_RETRY_ROUNDS = 3
+
+# Download priorities, lower runs first
+PRIORITY_VISIBLE = 0
+PRIORITY_HOVER = 1
+PRIORITY_BACKGROUND = 2
+
+# --- Cache config ---
+CACHE_DIR = os.environ.get("ISS_CUPOLA_CACHE",
+                           os.path.join(os.path.expanduser("~"), ".cache", "iss_cupola"))
+CACHE_MAX_BYTES = 1024 * 1024 * 1024   # evict least recently used images beyond 1 GB
+PARTIAL_MAX_AGE = 7 * 24 * 3600   # seconds an interrupted download is kept for resuming
+IMAGE_MEMORY_BUDGET = 512 * 1024 * 1024  # decoded pixels kept in RAM
+PYRAMID_MIN_SIZE = 256         # smallest pyramid level, longer side in pixels
+PERSIST_PYRAMIDS = True        # keep built pyramid levels next to the download cache
+PIXEL_CACHE = False            # keep decoded pixels as memory-mapped raw files (--pixel-cache)
+PIXEL_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+PIXEL_MAGIC = b"ISSPIXEL"
+PIXEL_VERSION = 1
+PIXEL_HEADER = struct.Struct("<8sIII8s")  # magic, version, width, height, raw mode
+
+# --- Manifest config ---
+MANIFEST_PATH = os.environ.get("ISS_CUPOLA_MANIFEST",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "iss_cupola_manifest.json"))
+MANIFEST_VERSION = 1
+
+# --- Bundle config ---
+BUNDLE_PATH = os.environ.get("ISS_CUPOLA_BUNDLE")  # offline image bundle written by `pack`
+BUNDLE_MAGIC = b"ISSCUPOL"
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct("<8sIIQQ")  # magic, version, entry count, metadata offset, metadata length
+BUNDLE_ENTRY = struct.Struct("<QQ")       # payload offset, payload length
+
+# --- Telemetry config ---
+TELEMETRY_REPORT = os.environ.get("ISS_CUPOLA_TELEMETRY")  # written on exit: *.prom as Prometheus text, else JSON
+SHOW_HUD = False               # live stage timings in the status bar (toggle with F3)
+HUD_INTERVAL_MS = 1000
+METRIC_PREFIX = "iss_cupola"
+
+# --- Render config ---
+TILE_SIZE = 256
+TILE_CACHE_BYTES = 128 * 1024 * 1024
+RENDER_CACHE_BYTES = 96 * 1024 * 1024   # finished viewport frames, keyed by the full view state
+INTERACTION_IDLE_MS = 150      # quiet time after zoom/pan/resize before the LANCZOS refinement
+PREFETCH_AHEAD = 3             # images pre-rendered ahead of the current one (next / slideshow order)
+PREFETCH_BEHIND = 1            # ... and behind it (prev), except during a slideshow
+TARGET_FPS = 60                # upper bound on viewer/overview redraws per second
+PHOTO_POOL_SIZES = 4           # frame sizes whose Tk photo images are kept for reuse
+PHOTO_POOL_FREE_TILES = 64     # spare tile photos kept per size for the canvas viewport
+
+
+def cache_key(url):
+    # Drive serves the same file under several URL shapes; the file id is the stable part
+    file_id = parse_qs(urlparse(url).query).get('id')
+    if file_id:
+        return f"drive:{file_id[0]}"
+    return url
+
+
+class StageTimer:
+    __slots__ = ('telemetry', 'stage', 'start')
+
+    def __init__(self, telemetry, stage):
+        self.telemetry = telemetry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.telemetry.record(self.stage, time.perf_counter() - self.start)
+
+
+class Telemetry:
+    # Process-wide counters and per-stage timings. Each stage only keeps count, total and
+    # max under one lock, so instrumenting hot paths costs a couple of perf_counter calls.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self.started = time.monotonic()
+
+    def timer(self, stage):
+        return StageTimer(self, stage)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            stages = {stage: {'count': count, 'total_s': total, 'mean_ms': total / count * 1000, 'max_ms': peak * 1000}
+                      for stage, (count, total, peak) in self._stages.items()}
+            counters = dict(self._counters)
+        return {'uptime_s': time.monotonic() - self.started, 'stages': stages, 'counters': counters}
+
+
+TELEMETRY = Telemetry()
+
+
+def prometheus_text(report, prefix=METRIC_PREFIX):
+    # Prometheus text exposition of a telemetry report: stage timings as summaries,
+    # counters as totals and every numeric cache statistic as a gauge labelled by cache
+    lines = [f"# TYPE {prefix}_uptime_seconds gauge", f"{prefix}_uptime_seconds {report['uptime_s']:.3f}",
+             f"# TYPE {prefix}_stage_seconds summary"]
+    # Each metric family has to be one contiguous block after its TYPE line
+    stages = sorted(report['stages'].items())
+    for stage, entry in stages:
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {entry["total_s"]:.6f}')
+    lines.append(f"# TYPE {prefix}_stage_max_seconds gauge")
+    lines.extend(f'{prefix}_stage_max_seconds{{stage="{stage}"}} {entry["max_ms"] / 1000:.6f}'
+                 for stage, entry in stages)
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, value in sorted(report['counters'].items()):
+        lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+    fields = {}
+    for cache, stats in report.get('caches', {}).items():
+        for field, value in stats.items():
+            if isinstance(value, (int, float)):
+                fields.setdefault(field, []).append((cache, value))
+    for field, values in sorted(fields.items()):
+        lines.append(f"# TYPE {prefix}_cache_{field} gauge")
+        lines.extend(f'{prefix}_cache_{field}{{cache="{cache}"}} {value}' for cache, value in values)
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report, path):
+    if path.endswith((".prom", ".txt")):
+        data = prometheus_text(report)
+    else:
+        data = json.dumps(report, indent=2, sort_keys=True) + "\n"
+    atomic_write(path, data.encode('utf-8'))
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    # Returns {window: [{'url', 'size', 'sha256'}, ...]} in file order. size and sha256
+    # are None until a sync has recorded them.
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"{path}: unsupported manifest version {data.get('version')!r}")
+    windows = {}
+    for item in data['images']:
+        windows.setdefault(item['window'], []).append({
+            'url': item['url'],
+            'size': item.get('size'),
+            'sha256': item.get('sha256')
+        })
+    return windows
+
+
+def save_manifest(windows, path=MANIFEST_PATH):
+    images = [{'window': window, **item} for window, items in windows.items() for item in items]
+    atomic_write(path, (json.dumps({'version': MANIFEST_VERSION, 'images': images}, indent=2) + "\n").encode('utf-8'))
+
+
+class TimedConnectMixin:
+    def _new_conn(self):
+        # DNS lookup plus TCP connect of a fresh pooled connection; reused ones skip this
+        with TELEMETRY.timer('http.connect'):
+            return super()._new_conn()
+
+
+class TimedHTTPConnection(TimedConnectMixin, urllib3.connection.HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectMixin, urllib3.connection.HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                   'https': TimedHTTPSConnectionPool}
+
+
+def make_session(pool_hosts=HTTP_POOL_HOSTS, pool_size=HTTP_POOL_SIZE):
+    # One keep-alive connection pool shared by every download worker, so consecutive
+    # downloads from Drive reuse connections instead of paying a TLS handshake each.
+    # Retries are left to RetryPolicy.
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def atomic_write(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class DiskCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        self.partial_dir = os.path.join(root, "partial")
+        # Pyramid levels built from an object live and die with it
+        self.pyramids_dir = os.path.join(root, "pyramids")
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self._remove_partial_writes()
+        self.index = self._load_index()
+
+    def _remove_partial_writes(self):
+        # Leftovers from a process that was killed before its rename
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except OSError:
+                        pass
+        # Interrupted downloads are kept for resuming, but not forever
+        cutoff = time.time() - PARTIAL_MAX_AGE
+        for name in os.listdir(self.partial_dir):
+            path = os.path.join(self.partial_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {key: entry for key, entry in index.items()
+                if os.path.exists(self.object_path(entry['sha256']))}
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self.index.get(key)
+            return dict(entry) if entry else None
+
+    def verified(self, key, sha256, size=None, rehash=False):
+        # Path of the cached copy of key if it is exactly the expected content, else None.
+        # Objects are stored under their digest, so without rehash this only trusts that
+        # nothing has modified the file since it was written.
+        result = self.get(key)
+        if result is None or result[0] != sha256:
+            return None
+        path = result[1]
+        try:
+            if size is not None and os.path.getsize(path) != size:
+                return None
+            if rehash and file_sha256(path) != sha256:
+                return None
+        except OSError:
+            return None
+        return path
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get(self, key):
+        # Returns (sha256, path) for a cached key, or None
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            path = self.object_path(entry['sha256'])
+            if not os.path.exists(path):
+                return None
+            entry['last_access'] = time.time()
+            return entry['sha256'], path
+
+    def partial_path(self, key):
+        return os.path.join(self.partial_dir, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def partial(self, key):
+        # Returns (bytes on disk, If-Range validator) for an interrupted download of key that
+        # can be resumed, or None. Without a strong validator there's no telling whether the
+        # bytes on disk still belong to the file the server has now.
+        path = self.partial_path(key)
+        try:
+            size = os.path.getsize(path)
+            with open(path + ".json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        etag = meta.get('etag')
+        validator = etag if etag and not etag.startswith('W/') else meta.get('last_modified')
+        if size == 0 or not validator:
+            return None
+        return size, validator
+
+    def discard_partial(self, key):
+        path = self.partial_path(key)
+        for name in (path, path + ".json"):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+    def put_stream(self, key, chunks, etag=None, last_modified=None, offset=0):
+        # Chunks go to the key's partial file, hashed as it grows, and it is renamed into
+        # place when complete. With an offset the first `offset` bytes are already on disk
+        # from an earlier attempt and the chunks continue from there. A failed transfer
+        # leaves the partial file behind for the next attempt to resume.
+        sha = hashlib.sha256()
+        size = 0
+        partial_path = self.partial_path(key)
+        if not offset:
+            atomic_write(partial_path + ".json",
+                         json.dumps({'etag': etag, 'last_modified': last_modified}).encode('utf-8'))
+        with open(partial_path, 'r+b' if offset else 'wb') as f:
+            while size < offset:
+                block = f.read(min(DOWNLOAD_CHUNK_SIZE, offset - size))
+                if not block:
+                    raise OSError(f"Partial download of {key} is shorter than {offset} bytes")
+                sha.update(block)
+                size += len(block)
+            f.truncate()
+            for chunk in chunks:
+                f.write(chunk)
+                sha.update(chunk)
+                size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        digest = sha.hexdigest()
+        path = self.object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(partial_path, path)
+        self.discard_partial(key)
+
+        with self._lock:
+            previous = self.index.pop(key, None)
+            if previous is not None and previous['sha256'] != digest:
+                self._release_object(previous['sha256'])
+            self.index[key] = {
+                'sha256': digest,
+                'size': size,
+                'etag': etag,
+                'last_modified': last_modified,
+                'last_access': time.time()
+            }
+            self._evict()
+            self._save_index()
+        return digest, path
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes()
+
+    def _total_bytes(self):
+        # Identical content stored under several keys only occupies disk once
+        return sum({entry['sha256']: entry['size'] for entry in self.index.values()}.values())
+
+    def stats(self):
+        # Safe to call from the Tk thread while download workers add entries
+        with self._lock:
+            return {'entries': len(self.index), 'bytes': self._total_bytes(), 'budget': self.max_bytes}
+
+    def remove(self, key):
+        # Forgets a cached download, e.g. a body that turned out not to be an image, so
+        # the next fetch goes back to the server instead of revalidating it
+        with self._lock:
+            if key in self.index:
+                self._drop(key)
+                self._save_index()
+
+    def _drop(self, key):
+        # Returns the bytes freed; the object file stays while other keys share it
+        entry = self.index.pop(key)
+        return entry['size'] if self._release_object(entry['sha256']) else 0
+
+    def _release_object(self, digest):
+        # Deletes an object and its pyramid once no key refers to it; returns True if it did
+        if any(other['sha256'] == digest for other in self.index.values()):
+            return False
+        try:
+            os.remove(self.object_path(digest))
+        except OSError:
+            pass
+        shutil.rmtree(os.path.join(self.pyramids_dir, digest[:2], digest), ignore_errors=True)
+        return True
+
+    def _evict(self):
+        total = self._total_bytes()
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes or len(self.index) <= 1:
+                break
+            total -= self._drop(key)
+
+    def _save_index(self):
+        atomic_write(self.index_path, json.dumps(self.index, indent=1).encode('utf-8'))
+
+    def flush(self):
+        with self._lock:
+            self._save_index()
+
+
+def build_pyramid(img):
+    # Successive 2x box reductions: 1/2, 1/4, 1/8 ... down to PYRAMID_MIN_SIZE
+    if img.mode not in ('L', 'RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+    levels = []
+    while max(img.size) // 2 >= PYRAMID_MIN_SIZE:
+        img = img.reduce(2)
+        levels.append(img)
+    return levels
+
+
+class PixelCache:
+    # Decoded pixels on disk as raw arrays behind a small header, laid out exactly as Pillow
+    # holds them in memory (RGB as RGBX). A hit maps the file and wraps the mapping with
+    # Image.frombuffer, so it costs page faults instead of a decode, and the OS can drop
+    # the pages of images nobody is looking at. Least recently used files go first once
+    # the directory outgrows max_bytes.
+    MODES = {'L': 'L', 'RGB': 'RGBX', 'RGBA': 'RGBA'}
+
+    def __init__(self, root, max_bytes=PIXEL_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = {}
+        os.makedirs(root, exist_ok=True)
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if name.startswith(".tmp-"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                elif name.endswith(".raw"):
+                    self._sizes[path] = os.path.getsize(path)
+
+    def path(self, digest, name):
+        return os.path.join(self.root, digest[:2], digest, name + ".raw")
+
+    def load(self, digest, name):
+        path = self.path(digest, name)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        magic, version, width, height, mode = PIXEL_HEADER.unpack_from(mapped, 0) \
+            if len(mapped) >= PIXEL_HEADER.size else (None, None, 0, 0, b"")
+        mode = mode.rstrip(b"\0").decode('ascii', 'replace')
+        bands = len(mode) if mode != 'L' else 1
+        if magic != PIXEL_MAGIC or version != PIXEL_VERSION or mode not in self.MODES.values() or \
+                len(mapped) != PIXEL_HEADER.size + width * height * bands:
+            mapped.close()
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        # The image keeps the mapping alive for as long as it is referenced
+        with TELEMETRY.timer('decode.mapped'):
+            return Image.frombuffer(mode, (width, height), memoryview(mapped)[PIXEL_HEADER.size:],
+                                    'raw', mode, 0, 1)
+
+    def store(self, digest, name, img):
+        mode = self.MODES.get(img.mode)
+        if mode is None:
+            return
+        path = self.path(digest, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(PIXEL_HEADER.pack(PIXEL_MAGIC, PIXEL_VERSION, img.width, img.height, mode.encode('ascii')))
+                f.write(img.tobytes('raw', mode))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._sizes[path] = os.path.getsize(path)
+            self._evict()
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        def last_used(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        for path in sorted(self._sizes, key=last_used):
+            if total <= self.max_bytes:
+                break
+            # Removing a file that is still mapped is fine; the mapping outlives it
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= self._sizes.pop(path)
+
+
+class ImageStore:
+    # Keeps a file reference for every image forever, but decoded pixels (full images
+    # and their pyramid levels) only for the most recently used ones, within a RAM budget
+    def __init__(self, budget=IMAGE_MEMORY_BUDGET, pyramid_dir=None, pixel_cache=None):
+        self.budget = budget
+        self.pyramid_dir = pyramid_dir
+        self.pixel_cache = pixel_cache
+        self._sources = {}
+        self._decoded = OrderedDict()
+        self._decoded_bytes = 0
+        self._lock = threading.Lock()
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="decode")
+        self._building = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def add(self, digest, path, info=None):
+        # Identical content is registered once, however many windows list it. path is a
+        # file path or a callable returning a binary file object; info ({size, format,
+        # mode}) saves reading the header when the caller already knows it.
+        with self._lock:
+            source = self._sources.get(digest)
+            if source is None:
+                if info is None:
+                    with self._open(path) as img:
+                        info = {'size': img.size, 'format': img.format, 'mode': img.mode}
+                source = self._sources[digest] = {'path': path, 'info': dict(info)}
+            return dict(source['info'])
+
+    @staticmethod
+    def _open(path):
+        return Image.open(path() if callable(path) else path)
+
+    def _lookup(self, key):
+        with self._lock:
+            value = self._decoded.get(key)
+            if value is not None:
+                self._decoded.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def _insert(self, key, value, nbytes):
+        with self._lock:
+            # Another thread may have produced the same value meanwhile; keep the first
+            existing = self._decoded.get(key)
+            if existing is not None:
+                return existing
+            self._decoded[key] = value
+            self._decoded_bytes += nbytes
+            self._evict()
+            return value
+
+    def get(self, digest):
+        img = self._lookup(('full', digest))
+        if img is not None:
+            return img
+
+        img = self._load_pixels(digest, 'full')
+        if img is None:
+            img = self._decode(digest)
+            self._store_pixels(digest, 'full', img)
+        img = self._insert(('full', digest), img, self.image_bytes(img))
+        self._schedule_pyramid(digest)
+        return img
+
+    def draft(self, digest, width, height):
+        # libjpeg can decode straight to 1/2, 1/4 or 1/8 scale inside its IDCT, which is far
+        # cheaper than a full decode and a fraction of the memory. Returns the smallest such
+        # decode that still covers width x height, or None when only a full decode will do
+        # (not a JPEG, or the view needs full resolution).
+        with self._lock:
+            info = self._sources[digest]['info']
+        if info['format'] != 'JPEG':
+            return None
+        full_width, full_height = info['size']
+        scale = 8
+        while scale > 1 and (math.ceil(full_width / scale) < width or math.ceil(full_height / scale) < height):
+            scale //= 2
+        if scale == 1:
+            return None
+
+        key = ('draft', digest, scale)
+        img = self._lookup(key)
+        if img is None:
+            img = self._load_pixels(digest, f"draft{scale}")
+            if img is None:
+                img = self._decode(digest, (full_width // scale, full_height // scale))
+                self._store_pixels(digest, f"draft{scale}", img)
+            if img.width < width or img.height < height:
+                return None
+            img = self._insert(key, img, self.image_bytes(img))
+        return img
+
+    def _load_pixels(self, digest, name):
+        if self.pixel_cache is None:
+            return None
+        return self.pixel_cache.load(digest, name)
+
+    def _store_pixels(self, digest, name, img):
+        # Written in the background; the caller already has its pixels
+        if self.pixel_cache is not None:
+            self._background.submit(self._write_pixels, digest, name, img)
+
+    def _write_pixels(self, digest, name, img):
+        try:
+            self.pixel_cache.store(digest, name, img)
+        except Exception as e:
+            print(f"Could not cache pixels for {digest[:12]}: {e}")
+
+    def _decode(self, digest, draft_size=None):
+        with TELEMETRY.timer('decode.draft' if draft_size else 'decode'):
+            img = self._open(self._sources[digest]['path'])
+            if draft_size:
+                img.draft(img.mode, draft_size)
+            img.load()
+            if img.mode not in ('L', 'RGB', 'RGBA'):
+                # Palette/CMYK/16-bit sources would otherwise resample poorly or not at all
+                img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        return img
+
+    def levels(self, digest):
+        levels = self._lookup(('pyramid', digest))
+        if levels is None:
+            levels = self._load_pyramid(digest)
+            if levels is not None:
+                levels = self._insert(('pyramid', digest), levels, sum(self.image_bytes(l) for l in levels))
+        return levels
+
+    def render_source(self, digest, width, height):
+        # Smallest pyramid level that still covers width x height; failing that the full
+        # image if it is already decoded, a reduced-scale JPEG decode, and only then a
+        # full decode (zooming past what the reduced decodes cover, or saving)
+        for level in reversed(self.levels(digest) or []):
+            if level.width >= width and level.height >= height:
+                return level
+        with self._lock:
+            full = self._decoded.get(('full', digest))
+        if full is not None:
+            return self.get(digest)
+        return self.draft(digest, width, height) or self.get(digest)
+
+    def cached_source(self, digest, width, height):
+        # Like render_source, but only considers what is already decoded in memory and
+        # never touches the disk; None when nothing is resident
+        with self._lock:
+            full = self._decoded.get(('full', digest))
+            candidates = list(self._decoded.get(('pyramid', digest)) or [])
+            candidates += [value for key, value in self._decoded.items() if key[0] == 'draft' and key[1] == digest]
+        candidates.sort(key=lambda img: img.width)
+        for img in candidates:
+            if img.width >= width and img.height >= height:
+                return img
+        return full or (candidates[-1] if candidates else None)
+
+    def _schedule_pyramid(self, digest):
+        with self._lock:
+            if ('pyramid', digest) in self._decoded or digest in self._building:
+                return
+            self._building.add(digest)
+        self._background.submit(self._build_pyramid, digest)
+
+    def _build_pyramid(self, digest):
+        try:
+            if self.levels(digest) is not None:
+                return
+            source = self.get(digest)
+            with TELEMETRY.timer('pyramid.build'):
+                levels = build_pyramid(source)
+            self._insert(('pyramid', digest), levels, sum(self.image_bytes(l) for l in levels))
+            self._save_pyramid(digest, levels)
+            for n, level in enumerate(levels, start=1):
+                self._store_pixels(digest, f"level{n}", level)
+        except Exception as e:
+            print(f"Could not build pyramid for {digest[:12]}: {e}")
+        finally:
+            with self._lock:
+                self._building.discard(digest)
+
+    def _pyramid_path(self, digest, n):
+        return os.path.join(self.pyramid_dir, digest[:2], digest, f"level{n}.png")
+
+    def _save_pyramid(self, digest, levels):
+        if not self.pyramid_dir:
+            return
+        for n, level in enumerate(levels, start=1):
+            path = self._pyramid_path(digest, n)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    (level.convert('RGB') if level.mode == 'RGBX' else level).save(f, 'PNG', compress_level=1)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _load_pyramid(self, digest):
+        levels = []
+        while self.pixel_cache is not None:
+            level = self.pixel_cache.load(digest, f"level{len(levels) + 1}")
+            if level is None:
+                break
+            levels.append(level)
+        if levels:
+            return levels
+
+        if not self.pyramid_dir or not os.path.exists(self._pyramid_path(digest, 1)):
+            return None
+        n = 1
+        try:
+            with TELEMETRY.timer('decode.pyramid'):
+                while os.path.exists(self._pyramid_path(digest, n)):
+                    level = Image.open(self._pyramid_path(digest, n))
+                    level.load()
+                    levels.append(level)
+                    n += 1
+        except OSError:
+            return None
+        for n, level in enumerate(levels, start=1):
+            self._store_pixels(digest, f"level{n}", level)
+        return levels
+
+    def _drop(self, key):
+        value = self._decoded.pop(key, None)
+        if value is not None:
+            self._decoded_bytes -= self.value_bytes(value)
+
+    def _evict(self):
+        while self._decoded_bytes > self.budget and len(self._decoded) > 1:
+            self._drop(next(iter(self._decoded)))
+            self.evictions += 1
+
+    @staticmethod
+    def image_bytes(img):
+        return img.width * img.height * len(img.getbands())
+
+    @classmethod
+    def value_bytes(cls, value):
+        if isinstance(value, list):
+            return sum(cls.image_bytes(level) for level in value)
+        return cls.image_bytes(value)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'images': len(self._sources),
+                'decoded': len(self._decoded),
+                'decoded_bytes': self._decoded_bytes,
+                'budget': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def shutdown(self):
+        self._background.shutdown(wait=False, cancel_futures=True)
+
+
+# Display rotation is clockwise; these transposes are lossless and need no resampling
+QUARTER_TURNS = {
+    90: Image.Transpose.ROTATE_270,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
+
+
+def tone_table(brightness, contrast, mean):
+    # Brightness followed by contrast around mean, fused into one 256-entry lookup table.
+    # Each stage truncates like the Image.blend that ImageEnhance uses.
+    table = []
+    for v in range(256):
+        v = int(min(255.0, v * brightness))
+        v = int(min(255.0, max(0.0, mean + contrast * (v - mean))))
+        table.append(v)
+    return table
+
+
+def apply_tone(img, table):
+    # One point() pass over every colour band; alpha is left untouched
+    identity = list(range(256))
+    return img.point([value for band in img.getbands() for value in (identity if band == 'A' else table)])
+
+
+class RenderPlan:
+    # Orders the steps that turn a source region into display pixels so the expensive
+    # ones run on as few pixels as possible: resample (or plain crop) first, then one
+    # fused tone pass over the small result, then a lossless transpose.
+    def __init__(self, source_size, box, out_size, rotation=0, brightness=1.0, contrast=1.0, mean=128,
+                 resample=Image.Resampling.LANCZOS):
+        self.resample = resample
+        self.steps = []
+        if out_size == (round(box[2] - box[0]), round(box[3] - box[1])) and \
+                all(float(edge).is_integer() for edge in box):
+            if tuple(box) != (0, 0) + tuple(source_size):
+                self.steps.append(('crop', tuple(int(edge) for edge in box)))
+        else:
+            self.steps.append(('resample', out_size, tuple(box)))
+        if brightness != 1.0 or contrast != 1.0:
+            self.steps.append(('tone', tone_table(brightness, contrast, mean)))
+        if rotation in QUARTER_TURNS:
+            self.steps.append(('transpose', QUARTER_TURNS[rotation]))
+        elif rotation:
+            self.steps.append(('rotate', rotation))
+
+    def apply(self, img):
+        for step in self.steps:
+            if step[0] == 'crop':
+                with TELEMETRY.timer('render.crop'):
+                    img = img.crop(step[1])
+            elif step[0] == 'resample':
+                with TELEMETRY.timer('render.resize'):
+                    img = img.resize(step[1], self.resample, box=step[2])
+            elif step[0] == 'tone':
+                with TELEMETRY.timer('render.enhance'):
+                    img = apply_tone(img, step[1])
+            elif step[0] == 'transpose':
+                with TELEMETRY.timer('render.rotate'):
+                    img = img.transpose(step[1])
+            else:
+                with TELEMETRY.timer('render.rotate'):
+                    img = img.rotate(-step[1], expand=True)
+        if img.mode == 'RGBX':
+            # Sources mapped from the pixel cache are RGBX; frames are RGB like every other path
+            img = img.convert('RGB')
+        return img
+
+
+class RenderCache:
+    # Byte-bounded LRU of rendered PIL images
+    def __init__(self, budget):
+        self.budget = budget
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            img = self._entries.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def put(self, key, img):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= ImageStore.image_bytes(previous)
+            self._entries[key] = img
+            self._bytes += ImageStore.image_bytes(img)
+            while self._bytes > self.budget and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= ImageStore.image_bytes(evicted)
+                self.evictions += 1
+        return img
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'budget': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+def unrotate_box(rect, display_size, rotation):
+    # Maps a rectangle of the clockwise-rotated display image back into the unrotated
+    # zoomed image; returns that box and the unrotated image size
+    x0, y0, x1, y1 = rect
+    display_width, display_height = display_size
+    if rotation == 90:
+        width, height = display_height, display_width
+        box = (y0, height - x1, y1, height - x0)
+    elif rotation == 180:
+        width, height = display_width, display_height
+        box = (width - x1, height - y1, width - x0, height - y0)
+    elif rotation == 270:
+        width, height = display_height, display_width
+        box = (width - y1, x0, width - y0, x1)
+    else:
+        width, height = display_width, display_height
+        box = (x0, y0, x1, y1)
+    return box, (width, height)
+
+
+class TileRenderer:
+    # Renders only the part of the zoomed, rotated image that is inside the viewport.
+    # Tiles are TILE_SIZE squares in display space, cut from the best pyramid level and
+    # cached, so panning only renders the tiles that scroll into view.
+    def __init__(self, store, tile_size=TILE_SIZE, budget=TILE_CACHE_BYTES):
+        self.store = store
+        self.tile_size = tile_size
+        self.tiles = RenderCache(budget)
+        self._means = {}
+
+    def render(self, image_id, display_size, rotation, brightness, contrast, origin, out_size):
+        size = self.tile_size
+        origin_x, origin_y = origin
+        out_width, out_height = out_size
+        mean = self._mean(image_id, brightness) if contrast != 1.0 else 128
+
+        frame = None
+        with TELEMETRY.timer('render.frame'):
+            for ty in range(origin_y // size, (origin_y + out_height - 1) // size + 1):
+                for tx in range(origin_x // size, (origin_x + out_width - 1) // size + 1):
+                    tile = self._tile(image_id, display_size, rotation, brightness, contrast, mean, tx, ty)
+                    if frame is None:
+                        frame = Image.new(tile.mode, out_size)
+                    frame.paste(tile, (tx * size - origin_x, ty * size - origin_y))
+        return frame
+
+    def render_tiles(self, image_id, display_size, rotation, brightness, contrast, coords):
+        # Individual tiles for the canvas viewport, as [((tx, ty), tile)]
+        mean = self._mean(image_id, brightness) if contrast != 1.0 else 128
+        return [((tx, ty), self._tile(image_id, display_size, rotation, brightness, contrast, mean, tx, ty))
+                for tx, ty in coords]
+
+    def _mean(self, image_id, brightness):
+        # ImageEnhance.Contrast pivots on the mean grey level of the whole image; every
+        # tile has to share it or the seams show, so take it once from the smallest level
+        key = (image_id, brightness)
+        if key not in self._means:
+            img = self.store.render_source(image_id, 1, 1)
+            if brightness != 1.0:
+                img = apply_tone(img, tone_table(brightness, 1.0, 0))
+            self._means[key] = int(ImageStat.Stat(img.convert('L')).mean[0] + 0.5)
+        return self._means[key]
+
+    def _tile(self, image_id, display_size, rotation, brightness, contrast, mean, tx, ty):
+        key = (image_id, display_size, rotation, brightness, contrast, tx, ty)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            return tile
+
+        display_width, display_height = display_size
+        x0, y0 = tx * self.tile_size, ty * self.tile_size
+        x1, y1 = min(x0 + self.tile_size, display_width), min(y0 + self.tile_size, display_height)
+
+        box, (width, height) = unrotate_box((x0, y0, x1, y1), display_size, rotation)
+        source = self.store.render_source(image_id, width, height)
+        return self.tiles.put(key, self._plan(source, box, width, height, rotation, brightness,
+                                              contrast, mean).apply(source))
+
+    def render_image(self, image_id, display_size, rotation, brightness, contrast):
+        # The whole zoomed, rotated image at full quality, straight from the full-resolution
+        # source and independent of the viewport; this is what Save writes
+        box, (width, height) = unrotate_box((0, 0) + tuple(display_size), display_size, rotation)
+        source = self.store.get(image_id)
+        mean = self._mean(image_id, brightness) if contrast != 1.0 else 128
+        return self._plan(source, box, width, height, rotation, brightness, contrast, mean).apply(source)
+
+    def render_preview(self, image_id, display_size, rotation, brightness, contrast, origin, out_size):
+        # Fast interaction frame: one resample pass over the visible region from whatever
+        # level is already in memory. Returns None if nothing is resident yet.
+        origin_x, origin_y = origin
+        rect = (origin_x, origin_y, origin_x + out_size[0], origin_y + out_size[1])
+        box, (width, height) = unrotate_box(rect, display_size, rotation)
+        source = self.store.cached_source(image_id, width, height)
+        if source is None:
+            return None
+        mean = self._mean(image_id, brightness) if contrast != 1.0 else 128
+        # BILINEAR is cheap when enlarging, but when shrinking its support widens with the
+        # scale factor; NEAREST keeps those frames within budget
+        resample = Image.Resampling.NEAREST if source.width > width else Image.Resampling.BILINEAR
+        with TELEMETRY.timer('render.preview'):
+            return self._plan(source, box, width, height, rotation, brightness, contrast, mean,
+                              resample).apply(source)
+
+    def _plan(self, source, box, width, height, rotation, brightness, contrast, mean,
+              resample=Image.Resampling.LANCZOS):
+        sx, sy = source.width / width, source.height / height
+        return RenderPlan(source.size, (box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy),
+                          (box[2] - box[0], box[3] - box[1]), rotation, brightness, contrast, mean,
+                          resample)
+
+
+class PhotoPool:
+    # Reuses Tk photo images across frames. Each (mode, size) gets a pair: the next frame is
+    # pasted into whichever one isn't on screen and then swapped in, so steady-state
+    # navigation allocates no Tk pixel buffers and never writes into the visible image.
+    def __init__(self, max_sizes=PHOTO_POOL_SIZES):
+        self.max_sizes = max(1, max_sizes)
+        self._pairs = OrderedDict()
+        self._shown = None
+        self._free = {}
+        self.allocations = 0
+        self.pastes = 0
+
+    def photo_for(self, img):
+        key = (img.mode, img.size)
+        pair = self._pairs.get(key)
+        if pair is None:
+            pair = self._pairs[key] = []
+            while len(self._pairs) > self.max_sizes:
+                self._pairs.popitem(last=False)
+        self._pairs.move_to_end(key)
+
+        photo = next((p for p in pair if p is not self._shown), None)
+        if photo is None:
+            with TELEMETRY.timer('photo.create'):
+                photo = ImageTk.PhotoImage(img.mode, img.size)
+            pair.append(photo)
+            self.allocations += 1
+        with TELEMETRY.timer('photo.paste'):
+            photo.paste(img)
+        self.pastes += 1
+        self._shown = photo
+        return photo
+
+    def acquire(self, img):
+        # Photo for a long-lived canvas item such as a viewport tile; hand it back with
+        # release() once the item is gone so the next tile of that size can reuse it
+        free = self._free.get((img.mode, img.size))
+        if free:
+            photo = free.pop()
+        else:
+            with TELEMETRY.timer('photo.create'):
+                photo = ImageTk.PhotoImage(img.mode, img.size)
+            self.allocations += 1
+        with TELEMETRY.timer('photo.paste'):
+            photo.paste(img)
+        self.pastes += 1
+        return photo
+
+    def release(self, key, photo):
+        free = self._free.setdefault(key, [])
+        if len(free) < PHOTO_POOL_FREE_TILES:
+            free.append(photo)
+
+    def stats(self):
+        return {
+            'sizes': len(self._pairs),
+            'photos': sum(len(pair) for pair in self._pairs.values()),
+            'free_tiles': sum(len(free) for free in self._free.values()),
+            'allocations': self.allocations,
+            'pastes': self.pastes
+        }
+
+
+class RedrawScheduler:
+    # Collapses any number of redraw requests into at most one draw per frame
+    def __init__(self, root, draw, fps=TARGET_FPS):
+        self.root = root
+        self.draw = draw
+        self.frame_ms = max(1, int(1000 / fps))
+        self._job = None
+        self._last_frame = 0.0
+        self.requests = 0
+        self.frames = 0
+
+    def request(self):
+        self.requests += 1
+        if self._job is None:
+            elapsed_ms = (time.monotonic() - self._last_frame) * 1000
+            self._job = self.root.after(max(0, int(self.frame_ms - elapsed_ms)), self._flush)
+
+    def _flush(self):
+        self._job = None
+        self._last_frame = time.monotonic()
+        self.frames += 1
+        self.draw()
+
+    def cancel(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+
+class RenderWorker:
+    # Runs render jobs on a background thread. Every submit gets a new generation number;
+    # only the newest job waits to run, and a finished job is delivered only if nothing
+    # newer was submitted while it was rendering.
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.generation = 0
+        self._pending = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self._thread.start()
+
+    def submit(self, job):
+        with self._cond:
+            self.generation += 1
+            self._pending = (self.generation, job)
+            self._cond.notify()
+            return self.generation
+
+    def cancel_pending(self):
+        with self._cond:
+            self.generation += 1
+            self._pending = None
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, job = self._pending
+                self._pending = None
+
+            try:
+                result, error = job(), None
+            except Exception as e:
+                result, error = None, e
+            if self.is_current(generation):
+                self.deliver(generation, result, error)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class Prefetcher:
+    # Pre-renders the frames the user is likely to ask for next on a background thread.
+    # Each schedule replaces whatever is still queued; frames land in the shared frame cache.
+    def __init__(self, frame_cache, render):
+        self.frame_cache = frame_cache
+        self.render = render
+        self.rendered = 0
+        self._queue = []
+        self._active = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+        self._thread.start()
+
+    def schedule(self, jobs):
+        # jobs are (frame_key, render_args) pairs, nearest first
+        with self._cond:
+            self._queue = [job for job in reversed(jobs) if job[0] not in self.frame_cache]
+            self._cond.notify()
+
+    def cancel(self):
+        with self._cond:
+            self._queue = []
+
+    def claim(self, key):
+        # The foreground renderer wants this frame now: take it off the queue, or wait
+        # for it if it's already rendering, so the same frame is never rendered twice
+        with self._cond:
+            self._queue = [job for job in self._queue if job[0] != key]
+            while self._active == key:
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                key, args = self._queue.pop()
+                if key in self.frame_cache:
+                    continue
+                self._active = key
+
+            try:
+                self.frame_cache.put(key, self.render(*args))
+                self.rendered += 1
+            except Exception as e:
+                print(f"Prefetch render failed: {e}")
+            finally:
+                with self._cond:
+                    self._active = None
+                    self._cond.notify_all()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._queue = []
+            self._cond.notify_all()
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host, retry_in):
+        super().__init__(f"{host} is failing, paused for another {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    # Decides whether a failed download is worth another attempt and how long to wait first
+    def __init__(self, attempts=DOWNLOAD_RETRIES, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+                 jitter=RETRY_JITTER, retryable_status=RETRYABLE_STATUS):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retryable_status = retryable_status
+
+    def is_retryable(self, error):
+        # Throttling, server errors, timeouts and dropped connections may clear up on their
+        # own; anything else (404, 403, a bad URL, a full disk) will fail the same way again
+        if isinstance(error, CircuitOpenError):
+            return True
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code in self.retryable_status
+        return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                                  requests.exceptions.ChunkedEncodingError))
+
+    def delay(self, attempt, error=None):
+        # Exponential backoff with jitter, so workers that failed together don't retry together;
+        # a Retry-After from the server is honoured as a lower bound
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay *= 1 - self.jitter * random.random()
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                delay = max(delay, min(self.max_delay, float(response.headers.get('Retry-After'))))
+            except (TypeError, ValueError):
+                pass
+        return delay
+
+
+class CircuitBreaker:
+    # Per host: after `threshold` consecutive retryable failures the host is left alone for
+    # `cooldown` seconds. After that requests go through again, and the next failure trips
+    # it straight away until a success resets the count.
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    def check(self, host):
+        retry_in = self.wait_time(host)
+        if retry_in > 0:
+            raise CircuitOpenError(host, retry_in)
+
+    def wait_time(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            return max(0.0, state['open_until'] - time.monotonic()) if state else 0.0
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host):
+        with self._lock:
+            state = self._hosts.setdefault(host, {'failures': 0, 'open_until': 0.0})
+            state['failures'] += 1
+            now = time.monotonic()
+            if state['failures'] >= self.threshold and state['open_until'] <= now:
+                state['open_until'] = now + self.cooldown
+                self.trips += 1
+                print(f"Pausing downloads from {host} for {self.cooldown:.0f}s after {state['failures']} failures")
+
+
+class DownloadEngine:
+    def __init__(self, max_workers=MAX_CONCURRENT_DOWNLOADS, per_host=MAX_DOWNLOADS_PER_HOST,
+                 timeout=(DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT), retry_policy=None, breaker=None,
+                 cache=None, on_progress=None, session=None):
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.session = session or make_session(pool_size=self.max_workers)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        # Downloads always stream to disk; without a persistent cache they land in a scratch
+        # one that shutdown removes again
+        self.scratch_dir = None if cache is not None else tempfile.mkdtemp(prefix="iss_cupola_")
+        self.cache = cache if cache is not None else DiskCache(self.scratch_dir)
+        self.on_progress = on_progress
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+        # Heap of [priority, sequence, key]; reprioritised jobs push a fresh entry
+        # and the stale one is skipped when it surfaces
+        self._queue = []
+        self._jobs = {}
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [threading.Thread(target=self._worker, name=f"download-{n}", daemon=True)
+                         for n in range(self.max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def fetch(self, url, refresh=False):
+        # Returns (sha256, path) of the downloaded or cached file; refresh ignores the cached copy
+        key = cache_key(url)
+        cached = None if refresh else self.cache.lookup(key)
+        if cached and not self.cache.conditional_headers(cached):
+            # Nothing to revalidate against, so the cached copy is as good as it gets
+            result = self.cache.get(key)
+            if result is not None:
+                TELEMETRY.count('disk_cache.hit')
+                return result
+            cached = None
+
+        host = urlparse(url).netloc
+        policy = self.retry_policy
+        for attempt in range(policy.attempts):
+            try:
+                self.breaker.check(host)
+                with self._host_slot(url):
+                    result = self._download(url, key, cached)
+                self.breaker.record_success(host)
+                return result
+            except Exception as e:
+                TELEMETRY.count('download.error')
+                retryable = policy.is_retryable(e)
+                if retryable and not isinstance(e, CircuitOpenError):
+                    self.breaker.record_failure(host)
+                if not retryable or attempt == policy.attempts - 1:
+                    result = self.cache.get(key) if cached else None
+                    if result is None:
+                        raise
+                    print(f"Revalidation failed for {url}, using cached copy")
+                    return result
+                # Back off outside the host slot so other downloads can use it, and not
+                # before a paused host is due to be tried again
+                TELEMETRY.count('download.retry')
+                time.sleep(max(policy.delay(attempt, e), self.breaker.wait_time(host)))
+
+    def _download(self, url, key, cached):
+        headers = {}
+        resume = None
+        if cached:
+            headers.update(self.cache.conditional_headers(cached))
+        else:
+            # Pick up where an interrupted attempt (this run or an earlier one) stopped;
+            # If-Range makes the server send the whole file instead if it has changed
+            resume = self.cache.partial(key)
+            if resume:
+                headers['Range'] = f"bytes={resume[0]}-"
+                headers['If-Range'] = resume[1]
+
+        with self.session.get(url, timeout=self.timeout, headers=headers, stream=True) as response:
+            # Request sent until headers parsed; includes the connect for a fresh connection
+            TELEMETRY.record('http.wait', response.elapsed.total_seconds())
+            TELEMETRY.count('http.requests')
+            if response.status_code == 304 and cached:
+                result = self.cache.get(key)
+                if result is not None:
+                    TELEMETRY.count('disk_cache.revalidated')
+                    return result
+                # Evicted between the lookup and the 304, fetch it unconditionally
+                return self._download(url, key, None)
+            if resume and (response.status_code == 416 or
+                           (response.status_code == 206 and
+                            not response.headers.get('Content-Range', '').startswith(f"bytes {resume[0]}-"))):
+                # The partial file doesn't line up with what the server has; start over
+                self.cache.discard_partial(key)
+                return self._download(url, key, None)
+            response.raise_for_status()
+
+            offset = resume[0] if resume and response.status_code == 206 else 0
+            if offset:
+                TELEMETRY.count('download.resumed')
+                TELEMETRY.count('download.resumed_bytes', offset)
+            length = int(response.headers.get('Content-Length') or 0)
+            total = offset + length if length else 0
+            TELEMETRY.count('disk_cache.miss')
+            with TELEMETRY.timer('http.transfer'):
+                return self.cache.put_stream(key, self._iter_chunks(url, response, total, offset),
+                                             etag=response.headers.get('ETag'),
+                                             last_modified=response.headers.get('Last-Modified'),
+                                             offset=offset)
+
+    def _iter_chunks(self, url, response, total, received=0):
+        last_report = 0
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            received += len(chunk)
+            TELEMETRY.count('http.bytes', len(chunk))
+            yield chunk
+            now = time.monotonic()
+            if self.on_progress and now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                self.on_progress(url, received, total)
+        if self.on_progress:
+            self.on_progress(url, received, total)
+
+    def submit(self, url, priority=PRIORITY_BACKGROUND, refresh=False):
+        # Single-flight: callers asking for a URL that is already queued or downloading share
+        # its future. refresh is passed on to fetch; it upgrades a job that hasn't started yet.
+        key = cache_key(url)
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = {'url': url, 'future': Future(), 'priority': None, 'entry': None,
+                                         'refresh': refresh}
+                job['future'].add_done_callback(lambda f, k=key: self._finish_job(k, f))
+                self._push(key, job, priority)
+            else:
+                if job['entry'] is not None:
+                    job['refresh'] = job['refresh'] or refresh
+                if job['entry'] is not None and priority < job['priority']:
+                    self._push(key, job, priority)
+            return job['future']
+
+    def reprioritize(self, urls, priority):
+        with self._cond:
+            for url in urls:
+                key = cache_key(url)
+                job = self._jobs.get(key)
+                if job and job['entry'] is not None and job['priority'] != priority:
+                    self._push(key, job, priority)
+
+    def cancel(self, urls):
+        # Only jobs still waiting in the queue can be cancelled
+        with self._cond:
+            for url in urls:
+                job = self._jobs.get(cache_key(url))
+                if job and job['entry'] is not None:
+                    job['entry'] = None
+                    job['future'].cancel()
+
+    def _push(self, key, job, priority):
+        job['priority'] = priority
+        job['entry'] = [priority, next(self._sequence), key]
+        heapq.heappush(self._queue, job['entry'])
+        self._cond.notify()
+
+    def _finish_job(self, key, future):
+        with self._cond:
+            job = self._jobs.get(key)
+            if job and job['future'] is future:
+                del self._jobs[key]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                entry = heapq.heappop(self._queue)
+                job = self._jobs.get(entry[2])
+                if job is None or job['entry'] is not entry:
+                    continue
+                job['entry'] = None
+                future = job['future']
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.fetch(job['url'], job['refresh']))
+            except Exception as e:
+                future.set_exception(e)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            queued = [job['url'] for job in self._jobs.values() if job['entry'] is not None]
+            self._cond.notify_all()
+        self.cancel(queued)
+        self.cache.flush()
+        self.session.close()
+        if self.scratch_dir is not None:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+def sync_manifest(path=MANIFEST_PATH, update=False):
+    # Brings the download cache in line with the manifest. Entries whose cached copy
+    # already matches their size and SHA-256 are left alone; everything else is downloaded
+    # and checked. Missing sizes and checksums are filled in, and with update=True a
+    # mismatch is accepted as the new expected content. Returns the number of failures.
+    windows = load_manifest(path)
+    cache = DiskCache()
+    engine = DownloadEngine(cache=cache)
+    by_url = {}
+    for items in windows.values():
+        for item in items:
+            by_url.setdefault(item['url'], []).append(item)
+
+    stale = {}
+    for url, items in by_url.items():
+        expected = items[0]
+        if expected['sha256'] and cache.verified(cache_key(url), expected['sha256'], expected['size'], rehash=True):
+            print(f"ok        {url}")
+        else:
+            stale[url] = expected
+
+    changed = failed = 0
+    try:
+        # A known checksum that didn't match means the cached copy is wrong, so go to the
+        # server; otherwise a revalidated cached copy is fine. URLs that name the same file
+        # share one download.
+        futures = {}
+        for url, expected in stale.items():
+            futures.setdefault(engine.submit(url, refresh=bool(expected['sha256'])), []).append(url)
+        for future in as_completed(futures):
+            for url in futures[future]:
+                expected = stale[url]
+                try:
+                    digest, object_path = future.result()
+                except Exception as e:
+                    print(f"FAILED    {url}: {e}")
+                    failed += 1
+                    continue
+                size = os.path.getsize(object_path)
+                if expected['sha256'] not in (None, digest) and not update:
+                    print(f"MISMATCH  {url}: expected {expected['sha256']}, got {digest} "
+                          f"(run sync --update to accept)")
+                    failed += 1
+                    continue
+                if (expected['sha256'], expected['size']) != (digest, size):
+                    for item in by_url[url]:
+                        item['sha256'], item['size'] = digest, size
+                    changed += 1
+                    print(f"updated   {url}")
+                else:
+                    print(f"fetched   {url}")
+    finally:
+        engine.shutdown()
+
+    print(f"{len(by_url) - len(stale)} verified, {len(stale) - failed} downloaded, {failed} failed, "
+          f"{changed} manifest entries updated")
+    if changed:
+        try:
+            save_manifest(windows, path)
+        except OSError as e:
+            print(f"Could not write {path}: {e}")
+            failed += 1
+    return failed
+
+
+class ImageBundle:
+    # Read side of the offline bundle written by pack_bundle. The file is mapped once;
+    # entries are sliced out of the mapping when decoded, so opening the bundle costs one
+    # open and a metadata parse however many images it holds.
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, meta_offset, meta_length = BUNDLE_HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not an image bundle this version can read")
+        self._table = [BUNDLE_ENTRY.unpack_from(self._map, BUNDLE_HEADER.size + n * BUNDLE_ENTRY.size)
+                       for n in range(count)]
+        meta = json.loads(self._map[meta_offset:meta_offset + meta_length])
+        # images: per entry sha256, bytes, width, height, format, mode (same order as the table)
+        # windows: same shape as load_manifest()
+        self.images = meta['images']
+        self.windows = meta['windows']
+        self._by_digest = {image['sha256']: n for n, image in enumerate(self.images)}
+
+    def find(self, digest):
+        return self._by_digest.get(digest)
+
+    def info(self, n):
+        image = self.images[n]
+        return {'size': (image['width'], image['height']), 'format': image['format'], 'mode': image['mode']}
+
+    def open(self, n):
+        offset, length = self._table[n]
+        return io.BytesIO(self._map[offset:offset + length])
+
+    def opener(self, n):
+        return partial(self.open, n)
+
+    def close(self):
+        self._map.close()
+
+
+def pack_bundle(path, manifest_path=MANIFEST_PATH):
+    # Packs every image in the manifest into one bundle for offline use, downloading
+    # whatever isn't cached yet. Layout: header, offset table, metadata JSON, then the
+    # original compressed files back to back. Returns the number of images packed.
+    windows = load_manifest(manifest_path)
+    urls = list(dict.fromkeys(item['url'] for items in windows.values() for item in items))
+    engine = DownloadEngine(cache=DiskCache())
+    try:
+        futures = {url: engine.submit(url) for url in urls}
+        fetched = {url: future.result() for url, future in futures.items()}
+    finally:
+        engine.shutdown()
+
+    images, payloads, index = [], [], {}
+    bundle_windows = {}
+    for window, items in windows.items():
+        for item in items:
+            digest, object_path = fetched[item['url']]
+            if item['sha256'] and item['sha256'] != digest:
+                raise ValueError(f"{item['url']} does not match its manifest checksum; run sync first")
+            if digest not in index:
+                with Image.open(object_path) as img:
+                    images.append({'sha256': digest, 'bytes': os.path.getsize(object_path), 'width': img.width,
+                                   'height': img.height, 'format': img.format, 'mode': img.mode})
+                index[digest] = len(payloads)
+                payloads.append(object_path)
+            bundle_windows.setdefault(window, []).append(
+                {'url': item['url'], 'size': images[index[digest]]['bytes'], 'sha256': digest})
+
+    meta = json.dumps({'images': images, 'windows': bundle_windows}).encode('utf-8')
+    meta_offset = BUNDLE_HEADER.size + BUNDLE_ENTRY.size * len(images)
+    offset = meta_offset + len(meta)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(images), meta_offset, len(meta)))
+            for image in images:
+                f.write(BUNDLE_ENTRY.pack(offset, image['bytes']))
+                offset += image['bytes']
+            f.write(meta)
+            for object_path in payloads:
+                with open(object_path, 'rb') as src:
+                    shutil.copyfileobj(src, f, DOWNLOAD_CHUNK_SIZE)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    print(f"Packed {len(images)} images ({offset / 1e6:.1f} MB) for {len(bundle_windows)} windows into {path}")
+    return len(images)
+
+
+class ImageRecord:
+    # One manifest image. state is 'pending', 'loaded' or 'failed'; info holds the store's
+    # metadata once loaded, or the error and whether it is worth retrying once failed.
+    __slots__ = ('window', 'index', 'url', 'state', 'image_id', 'info')
+
+    def __init__(self, window, index, url):
+        self.window = window
+        self.index = index
+        self.url = url
+        self.state = 'pending'
+        self.image_id = None
+        self.info = {'url': url}
+
+
+class ImageCatalog:
+    # Every image of every window. Each window keeps its loaded indexes as a sorted list and
+    # its pending and failed ones as sets, and the counters move with every state change,
+    # so the overview, hover and navigation never scan a window's images.
+    def __init__(self, windows):
+        self._records = {}
+        self._indexes = {}
+        self.counts = {'pending': 0, 'loaded': 0, 'failed': 0}
+        for window, urls in windows.items():
+            self._records[window] = [ImageRecord(window, i, url) for i, url in enumerate(urls)]
+            self._indexes[window] = {'pending': set(range(len(urls))), 'loaded': [], 'failed': set()}
+            self.counts['pending'] += len(urls)
+        self.total = self.counts['pending']
+
+    def __len__(self):
+        return self.total
+
+    def __contains__(self, window):
+        return window in self._records
+
+    @property
+    def loaded(self):
+        return self.counts['loaded']
+
+    @property
+    def failed(self):
+        return self.counts['failed']
+
+    @property
+    def pending(self):
+        return self.counts['pending']
+
+    def records(self, window):
+        return self._records.get(window, [])
+
+    def get(self, window, index):
+        return self._records[window][index]
+
+    def count(self, window, state):
+        indexes = self._indexes.get(window)
+        return len(indexes[state]) if indexes else 0
+
+    def pending_records(self, window):
+        return [record for record in self._records.get(window, []) if record.state == 'pending']
+
+    def failed_records(self):
+        return [self._records[window][i] for window, indexes in self._indexes.items()
+                for i in sorted(indexes['failed'])]
+
+    def first(self, window, state):
+        indexes = self._indexes.get(window)
+        if not indexes or not indexes[state]:
+            return None
+        return indexes[state][0] if state == 'loaded' else min(indexes[state])
+
+    def position(self, window, index):
+        # 1-based position of a loaded image among its window's loaded images
+        return bisect.bisect_left(self._indexes[window]['loaded'], index) + 1
+
+    def step(self, window, index, offset):
+        # The loaded image offset places away from index, wrapping around the window;
+        # from an image that isn't loaded, one step forward is the next loaded one
+        loaded = self._indexes[window]['loaded']
+        if not loaded:
+            return None
+        pos = bisect.bisect_left(loaded, index)
+        if (pos >= len(loaded) or loaded[pos] != index) and offset > 0:
+            pos -= 1
+        return loaded[(pos + offset) % len(loaded)]
+
+    def mark_loaded(self, record, image_id, info):
+        record.image_id = image_id
+        record.info = info
+        self._move(record, 'loaded')
+
+    def mark_failed(self, record, error, retryable):
+        record.image_id = None
+        record.info = {'error': error, 'retryable': retryable, 'url': record.url}
+        self._move(record, 'failed')
+
+    def mark_pending(self, record):
+        record.image_id = None
+        record.info = {'url': record.url}
+        self._move(record, 'pending')
+
+    def _move(self, record, state):
+        indexes = self._indexes[record.window]
+        if record.state == 'loaded':
+            loaded = indexes['loaded']
+            del loaded[bisect.bisect_left(loaded, record.index)]
+        else:
+            indexes[record.state].discard(record.index)
+        self.counts[record.state] -= 1
+
+        record.state = state
+        if state == 'loaded':
+            bisect.insort(indexes['loaded'], record.index)
+        else:
+            indexes[state].add(record.index)
+        self.counts[state] += 1
+
 
 class ISS_Cupola_Viewer:
-    def __init__(self):
+    def __init__(self, manifest_path=MANIFEST_PATH, telemetry_path=TELEMETRY_REPORT, show_hud=SHOW_HUD,
+                 bundle_path=BUNDLE_PATH, pixel_cache=PIXEL_CACHE):
         self.root = tk.Tk()
         self.root.title("ISS Cupola Earth Viewer - Enhanced Edition")
         self.root.geometry("1200x800")
         self.root.configure(bg="#0a0a0a")
         self.root.minsize(800, 600)
 
-        # Enhanced window data with ALL properly formatted Google Drive URLs
-        self.cupola_windows = {
-            "Window 0": [
-                "https://drive.google.com/uc?export=download&id=1pfF3bDvlDouq0r6pNnLcXHwcU3piPCru",
-                "https://drive.google.com/uc?export=download&id=1K8o7djvEmIBdz4at7iv3Sbs5ukN2wi9L",
-                "https://drive.google.com/uc?export=download&id=1apFAc1ye7-2nVnS7tPjc57Rd6qMTMKr8",
-                "https://drive.google.com/uc?export=download&id=1qe48ivsfLsvGZi5eE3e0PKcSM9Eu5re7",
-                "https://drive.google.com/uc?export=download&id=1d1zD3-mF9c5QLAS0yMK_keb6DXxT_BDn",
-            ],
-            "Window 1": [
-                "https://drive.google.com/uc?export=download&id=1aTPf80gcjwutNh-AelhoARhNGDN3QaKg",
-                "https://drive.google.com/uc?export=download&id=15g5dNuz7OGlaE--dEeXTGxjS6AdX25Sg",
-                "https://drive.google.com/uc?export=download&id=1wZhf-uknETMyPb4_mgOg9reLVXZtSPC5",
-                "https://drive.google.com/uc?export=download&id=1I8GenxSDJ-41NRCuENjXD3mt1i6hMEuy",
-                "https://drive.google.com/uc?export=download&id=1A1hjEv5MBOd2yD2OqptSzwr-T_7dn63u",
-            ],
-            "Window 2": [
-                "https://drive.google.com/uc?export=download&id=1aTPf80gcjwutNh-AelhoARhNGDN3QaKg",
-                "https://drive.google.com/uc?export=download&id=1Kh1sCO0WF6NkhsLeJB55Pp8c6Oax77VJ",
-                "https://drive.google.com/uc?export=download&id=1djwHw8aCj6xUNS4RC6zxXPKhko7KiWAZ",
-                "https://drive.google.com/uc?export=download&id=106KpUBeYFBVJmLIWnBfTWCgNxP6w7cne",
-                "https://drive.google.com/uc?export=download&id=1sOgvQpjOcxQl_zvaowLW3i3amxlgH0Ts",
-            ],
-            "Window 3": [
-                "https://drive.google.com/uc?export=download&id=1K8o7djvEmIBdz4at7iv3Sbs5ukN2wi9L",
-                "https://drive.google.com/uc?export=download&id=12zCqc-y_t9zti6Vz0eZu5awYIEmVq3v9",
-                "https://drive.google.com/uc?export=download&id=1x3lqnMhlUQDJeHr3hzuOSXkf-qPfgGC3",
-                "https://drive.google.com/uc?export=download&id=1KQL7qKNClmg1edGAkGm5m44g4R0gmDBu",
-                "https://drive.google.com/uc?export=download&id=1gG-uj42zOsj-G4L7GTztSBumKKWZ_jLR",
-            ],
-            "Window 4": [
-                "https://drive.google.com/uc?export=download&id=1pfF3bDvlDouq0r6pNnLcXHwcU3piPCru",
-                "https://drive.google.com/uc?export=download&id=16ckndM4z3iQ6S9f31kel6j4rBz-GFpJC",
-                "https://drive.google.com/uc?export=download&id=1UGHEATWSiyfXiWH-s5_0hD4vSn7U4Z0M",
-                "https://drive.google.com/uc?export=download&id=1A5SXNiqOwlzRe18e5MZuYMZtkGcsXIB8",
-                "https://drive.google.com/uc?export=download&id=1SqRRYREYPAcIL33r9pbBz9S31JAIXfY-",
-            ],
-            "Window 5": [
-                "https://drive.google.com/uc?export=download&id=1SMqMSQR_enzXFp_mA4CHeqKCZlWhDKaN",
-                "https://drive.google.com/uc?export=download&id=1_AM4gbGlZtL_j_MjRqrh0qtTkPQ1kna3",
-                "https://drive.google.com/uc?export=download&id=1L8-NEsrqRFgQkncoCHCVCaQW7HhAnc8i",
-                "https://drive.google.com/uc?export=download&id=15qcxHZ_hXtoMqEFFRRWD37g092SfFRYA",
-            ],
-            "Window 6": [
-                "https://drive.google.com/uc?export=download&id=1E9-ZsqXMtZL3b_rJa_LOWua2aTKrjf3K",
-                "https://drive.google.com/uc?export=download&id=10ILjbLn2cZUtTUwWGbN1IG7Srtv1GoVO",
-                "https://drive.google.com/uc?export=download&id=1SJttmNLmfZXE7SbtJ8G4-DqRH8X8Bn-f",
-                "https://drive.google.com/uc?export=download&id=1AbwhVL7uEUd9zHhlE3GUeqaG7A9ciYUy",
-            ],
-        }
+        # Windows and their image URLs come from the manifest, in file order; a bundle
+        # carries its own copy of the manifest it was packed from
+        self.bundle = ImageBundle(bundle_path) if bundle_path else None
+        self.manifest = self.bundle.windows if self.bundle else load_manifest(manifest_path)
+        self.cupola_windows = {window: [item['url'] for item in items] for window, items in self.manifest.items()}
 
-        self.preloaded_images = {}
+        self.catalog = ImageCatalog(self.cupola_windows)
         self.current_window = None
         self.current_index = 0
         self.zoom_factor = 1.0
@@ -79,13 +1888,52 @@ class ISS_Cupola_Viewer:
         self.contrast = 1.0
         self.fullscreen_mode = False
         self.loading_progress = 0
-        self.total_images = sum(len(urls) for urls in self.cupola_windows.values())
-        self.failed_images = 0
+        # In-flight downloads per window, {window: {index: future}}
+        self.pending_requests = {}
+        self.last_root_size = None
+        self.hovered_window = None
+        self.cupola_items = {}
+        self.cupola_layout = None
+        self.cupola_labels = {}
+        self.transfer_progress = {}
+        self.progress_refresh_pending = False
+        self.telemetry_path = telemetry_path
+        self.hud_job = None
+        self.retry_batch = None
+        self.auto_retry_job = None
+        self.auto_retry_rounds = 0
+        self.loading_finished = False
+        self.download_engine = DownloadEngine(cache=self.open_disk_cache(), on_progress=self.on_download_progress)
+        cache_root = self.download_engine.cache.root
+        self.image_store = ImageStore(pyramid_dir=self.download_engine.cache.pyramids_dir if PERSIST_PYRAMIDS else None,
+                                      pixel_cache=PixelCache(os.path.join(cache_root, "pixels")) if pixel_cache else None)
+        self.tile_renderer = TileRenderer(self.image_store)
+        self.frame_cache = RenderCache(RENDER_CACHE_BYTES)
+        self.render_worker = RenderWorker(self.on_frame_rendered)
+        self.tile_worker = RenderWorker(self.on_tiles_rendered)
+        self.prefetcher = Prefetcher(self.frame_cache, self.tile_renderer.render)
+        self.photo_pool = PhotoPool()
+        self.interaction_active = False
+        self.refine_job = None
+        self.redraw_scheduler = RedrawScheduler(self.root, self.redraw_view)
+        # What the image canvas currently shows (see present_frame) and the view state
+        # update_image_display last asked for
+        self.view = None
+        self.requested_state = None
 
         self.setup_ui()
         self.bind_events()
+        if show_hud:
+            self.toggle_hud()
         self.start_preloading()
 
+    def open_disk_cache(self):
+        try:
+            return DiskCache()
+        except OSError as e:
+            print(f"Image cache disabled, could not open {CACHE_DIR}: {e}")
+            return None
+
     def setup_ui(self):
         self.main_frame = tk.Frame(self.root, bg="#0a0a0a")
         self.main_frame.pack(fill="both", expand=True)
@@ -98,8 +1946,8 @@ class ISS_Cupola_Viewer:
         self.canvas.pack(fill="both", expand=True)
 
         self.image_frame = tk.Frame(self.content_frame, bg="#0a0a0a")
-        self.image_label = tk.Label(self.image_frame, bg="#0a0a0a")
-        self.image_label.pack()
+        self.image_canvas = tk.Canvas(self.image_frame, bg="#0a0a0a", highlightthickness=0)
+        self.image_canvas.pack()
 
         self.controls_frame = tk.Frame(self.image_frame, bg="#0a0a0a")
         self.controls_frame.pack(side="bottom", fill="x", pady=10)
@@ -111,9 +1959,6 @@ class ISS_Cupola_Viewer:
         self.progress_bar = ttk.Progressbar(self.main_frame, variable=self.progress_var,
                                             maximum=100, length=400, mode='determinate')
 
-        self.loading_label = tk.Label(self.main_frame, text="Loading ISS Cupola imagery from Google Drive...\nThis may take a moment, please be patient.",
-                                      bg="#0a0a0a", fg="white", font=("Arial", 12), justify=tk.CENTER)
-
         self.loading_details = tk.Label(self.main_frame, text="", bg="#0a0a0a", fg="#888888", font=("Arial", 10), justify=tk.CENTER)
 
     def setup_toolbar(self):
@@ -196,6 +2041,10 @@ class ISS_Cupola_Viewer:
                                         font=("Arial", 9), anchor="e")
         self.image_info_label.pack(side="right", padx=10)
 
+        # Packed by toggle_hud
+        self.hud_label = tk.Label(self.status_bar, text="", bg="#1a1a1a", fg="#7fd4ff",
+                                  font=("Courier", 9), anchor="e")
+
     def bind_events(self):
         self.root.bind("<Right>", lambda e: self.next_image())
         self.root.bind("<Left>", lambda e: self.prev_image())
@@ -205,86 +2054,189 @@ class ISS_Cupola_Viewer:
         self.root.bind("<Control-r>", lambda e: self.reset_view())
         self.root.bind("<space>", lambda e: self.next_image())
         self.root.bind("<BackSpace>", lambda e: self.show_cupola())
+        self.root.bind("<F3>", lambda e: self.toggle_hud())
         self.root.bind("<F1>", lambda e: self.show_help())
         self.root.bind("<F5>", lambda e: self.reload_failed_images())
         self.root.bind("<plus>", lambda e: self.zoom_in())
         self.root.bind("<minus>", lambda e: self.zoom_out())
         self.root.bind("<Key-0>", lambda e: self.reset_zoom())
 
-        self.image_label.bind("<Button-1>", self.start_pan)
-        self.image_label.bind("<B1-Motion>", self.do_pan)
-        self.image_label.bind("<ButtonRelease-1>", self.end_pan)
-        self.image_label.bind("<MouseWheel>", self.mouse_zoom)
+        self.image_canvas.bind("<Button-1>", self.start_pan)
+        self.image_canvas.bind("<B1-Motion>", self.do_pan)
+        self.image_canvas.bind("<ButtonRelease-1>", self.end_pan)
+        self.image_canvas.bind("<MouseWheel>", self.mouse_zoom)
 
         self.root.bind("<Configure>", self.on_window_resize)
 
     def start_preloading(self):
+        for window, items in self.manifest.items():
+            for record, item in zip(self.catalog.records(window), items):
+                entry = self.make_verified_entry(item)
+                if entry is not None:
+                    self.catalog.mark_loaded(record, *entry)
+
         self.show_loading_interface()
-        self.loading_thread = threading.Thread(target=self.preload_images, daemon=True)
-        self.loading_thread.start()
+        if self.catalog.pending == 0:
+            self.loading_finished = True
+            self.loading_complete()
+            return
+        self.refresh_progress()
+        if BACKGROUND_PRELOAD:
+            for window in self.cupola_windows:
+                self.request_window(window, PRIORITY_BACKGROUND)
+
+    def make_verified_entry(self, item):
+        # A manifest entry found in the bundle, or whose cached copy has the recorded size
+        # and checksum, is used as is without asking the server; returns None if it has to
+        # be downloaded
+        if not item['sha256']:
+            return None
+        if self.bundle is not None:
+            n = self.bundle.find(item['sha256'])
+            if n is not None:
+                return self.make_image_entry(item['url'], item['sha256'], self.bundle.opener(n), self.bundle.info(n))
+        path = self.download_engine.cache.verified(cache_key(item['url']), item['sha256'], item['size'])
+        if path is None:
+            return None
+        try:
+            return self.make_image_entry(item['url'], item['sha256'], path)
+        except Exception as e:
+            print(f"Cached copy of {item['url']} is unreadable: {e}")
+            return None
 
     def show_loading_interface(self):
-        self.canvas.pack_forget()
-        self.loading_label.pack(expand=True, pady=20)
-        self.loading_details.pack(pady=10)
-        self.progress_bar.pack(pady=10)
-        self.update_status("Loading ISS Cupola images from Google Drive...")
-
-    def preload_images(self):
-        loaded_count = 0
-        self.failed_images = 0
-
-        for window, urls in self.cupola_windows.items():
-            self.preloaded_images[window] = []
-            for i, url in enumerate(urls):
-                try:
-                    self.root.after(0, self.update_loading_details, f"Loading {window} - Image {i+1}/{len(urls)}")
-
-                    retry_key = f"{window}_{i}"
-                    max_retries = 3
-
-                    for attempt in range(max_retries):
-                        try:
-                            response = requests.get(url, timeout=30,
-                                                    headers={'User-Agent': 'Mozilla/5.0'})
-                            response.raise_for_status()
-
-                            pil_img = Image.open(BytesIO(response.content))
-
-                            self.preloaded_images[window].append({
-                                'original': pil_img,
-                                'display': None,
-                                'info': {
-                                    'size': pil_img.size,
-                                    'format': pil_img.format,
-                                    'mode': pil_img.mode,
-                                    'url': url
-                                }
-                            })
-                            break
-                        except Exception as retry_error:
-                            if attempt == max_retries - 1:
-                                raise retry_error
-                            else:
-                                time.sleep(1)
-
-                    loaded_count += 1
-                    progress = (loaded_count / self.total_images) * 100
-                    self.root.after(0, self.update_progress, progress)
+        # The overview is usable straight away; loading progress sits above the status bar
+        self.progress_bar.pack(side="bottom", pady=5)
+        self.loading_details.pack(side="bottom")
+        self.request_redraw()
+        self.update_status("Loading ISS Cupola images from Google Drive in the background...")
+
+    def request_window(self, window_key, priority):
+        # Hovering runs this on every <Enter>; once a window's pending images are all in
+        # flight it only moves their queue entries
+        in_flight = self.pending_requests.setdefault(window_key, {})
+        if in_flight:
+            self.download_engine.reprioritize([self.catalog.get(window_key, i).url for i in in_flight], priority)
+        if len(in_flight) >= self.catalog.count(window_key, 'pending'):
+            return
+        for record in self.catalog.pending_records(window_key):
+            if record.index not in in_flight:
+                future = self.download_engine.submit(record.url, priority)
+                in_flight[record.index] = future
+                future.add_done_callback(lambda f, w=window_key, i=record.index: self.on_download_done(w, i, f))
+
+    def release_window(self, window_key):
+        # Demote (or, without background preloading, drop) whatever is still queued for a window
+        urls = [self.catalog.get(window_key, i).url for i in self.pending_requests.get(window_key, {})]
+        if BACKGROUND_PRELOAD:
+            self.download_engine.reprioritize(urls, PRIORITY_BACKGROUND)
+        else:
+            self.download_engine.cancel(urls)
 
+    def on_download_done(self, window_key, i, future):
+        # Runs on the download worker, so decode the header here and hand the result to Tk
+        entry, error = None, None
+        if not future.cancelled():
+            url = self.catalog.get(window_key, i).url
+            try:
+                result = future.result()
+            except Exception as e:
+                error = e
+            else:
+                try:
+                    entry = self.make_image_entry(url, *result)
                 except Exception as e:
-                    print(f"Error loading {url}: {e}")
-                    self.failed_images += 1
-                    self.preloaded_images[window].append({
-                        'original': None,
-                        'display': None,
-                        'info': {
-                            'error': str(e),
-                            'url': url
-                        }
-                    })
-
-        self.root.after(0, self.loading_complete)
+                    # Not an image (a quota or sign-in page, say); don't let the cache keep
+                    # serving it, so a retry downloads it again
+                    self.download_engine.cache.remove(cache_key(url))
+                    error = e
+        try:
+            self.root.after(0, self.image_loaded, window_key, i, future, entry, error)
+        except (RuntimeError, tk.TclError):
+            # Queued jobs are cancelled during shutdown, after the Tk root is gone
+            pass
+
+    def image_loaded(self, window_key, i, future, entry, error):
+        in_flight = self.pending_requests.get(window_key, {})
+        if in_flight.get(i) is future:
+            del in_flight[i]
+        if future.cancelled():
+            self.check_loading_finished()
+            return
+
+        record = self.catalog.get(window_key, i)
+        self.transfer_progress.pop(record.url, None)
+        if entry is None:
+            print(f"Error loading {record.url}: {error}")
+            self.catalog.mark_failed(record, str(error), self.download_engine.retry_policy.is_retryable(error))
+        else:
+            self.catalog.mark_loaded(record, *entry)
+
+        finished = self.catalog.total - self.catalog.pending
+        self.update_loading_details(f"Loaded {window_key} - Image {i+1}/{len(self.cupola_windows[window_key])} "
+                                    f"({finished}/{self.catalog.total})")
+        self.refresh_progress()
+
+        if self.current_window == window_key:
+            if entry is not None and self.catalog.get(window_key, self.current_index).image_id is None:
+                self.show_image(window_key, i)
+            elif not self.catalog.count(window_key, 'loaded') and not self.catalog.count(window_key, 'pending'):
+                # The window was opened while still loading and nothing in it arrived
+                self.show_cupola()
+                self.warn_window_failed(window_key)
+        elif not self.current_window:
+            self.request_redraw()
+
+        batch = self.retry_batch
+        if batch is not None and (window_key, i) in batch['keys']:
+            batch['keys'].discard((window_key, i))
+            batch['recovered'] += entry is not None
+            if not batch['keys']:
+                self.retry_batch = None
+                self.retry_complete(batch)
+
+        self.check_loading_finished()
+
+    def check_loading_finished(self):
+        # Without background preloading, the images of windows that were left before they
+        # loaded (or never opened) are not coming, so loading is over once nothing is in flight
+        if self.loading_finished:
+            return
+        if self.catalog.pending == 0 or (not BACKGROUND_PRELOAD and not any(self.pending_requests.values())):
+            self.loading_finished = True
+            self.loading_complete()
+
+    def on_download_progress(self, url, received, total):
+        # Called from download workers; only the latest fraction is kept and Tk polls it
+        self.transfer_progress[url] = received / total if total else 0.0
+        if not self.progress_refresh_pending:
+            self.progress_refresh_pending = True
+            try:
+                self.root.after(int(PROGRESS_INTERVAL * 1000), self.refresh_progress)
+            except (RuntimeError, tk.TclError):
+                pass
+
+    def refresh_progress(self):
+        self.progress_refresh_pending = False
+        finished = self.catalog.total - self.catalog.pending
+        partial = sum(self.transfer_progress.values())
+        self.update_progress(min(100.0, (finished + partial) / self.catalog.total * 100))
+
+    def request_redraw(self):
+        # Every redraw of the viewer or the overview goes through here
+        self.redraw_scheduler.request()
+
+    def redraw_view(self):
+        if self.current_window:
+            self.update_image_display()
+        else:
+            self.draw_cupola()
+
+    def make_image_entry(self, url, digest, path, info=None):
+        # Returns the (image_id, info) pair a catalog record is marked loaded with
+        info = self.image_store.add(digest, path, info)
+        info.update({'url': url, 'sha256': digest})
+        return digest, info
 
     def update_loading_details(self, details):
         self.loading_details.config(text=details)
@@ -295,85 +2247,92 @@ class ISS_Cupola_Viewer:
         self.root.update_idletasks()
 
     def loading_complete(self):
-        self.loading_label.pack_forget()
         self.loading_details.pack_forget()
         self.progress_bar.pack_forget()
-        self.canvas.pack(fill="both", expand=True)
-        self.draw_cupola()
+        self.request_redraw()
 
-        success_count = self.total_images - self.failed_images
-        status_msg = f"Ready - Loaded {success_count}/{self.total_images} images successfully"
-        if self.failed_images > 0:
-            status_msg += f" ({self.failed_images} failed - press F5 to retry)"
+        status_msg = f"Ready - Loaded {self.catalog.loaded}/{self.catalog.total} images successfully"
+        if self.catalog.failed > 0:
+            status_msg += f" ({self.catalog.failed} failed - press F5 to retry)"
 
         self.update_status(status_msg)
 
-        if self.failed_images > 0:
+        if self.catalog.failed > 0:
+            auto_retry = self.schedule_auto_retry()
             messagebox.showwarning("Loading Complete",
-                                   f"Loaded {success_count} out of {self.total_images} images.\n"
-                                   f"{self.failed_images} images failed to load.\n\n"
-                                   f"You can press F5 or click the Reload button to retry failed images.")
-        else:
-            messagebox.showinfo("Loading Complete",
-                               f"Successfully loaded all {success_count} ISS Earth observation images!\n\n"
-                               f"Click on any cupola window to start viewing.")
+                                   f"Loaded {self.catalog.loaded} out of {self.catalog.total} images.\n"
+                                   f"{self.catalog.failed} images failed to load.\n\n"
+                                   + ("Temporary failures will be retried automatically in the background.\n"
+                                      if auto_retry else "")
+                                   + "You can press F5 or click the Reload button to retry failed images.")
 
     def reload_failed_images(self):
-        if self.failed_images == 0:
+        if self.catalog.failed == 0:
             messagebox.showinfo("No Failed Images", "All images loaded successfully!")
             return
 
         self.update_status("Retrying failed image downloads...")
-        retry_thread = threading.Thread(target=self.retry_failed_loads, daemon=True)
-        retry_thread.start()
-
-    def retry_failed_loads(self):
-        retried_count = 0
-        recovered_count = 0
-
-        for window, images in self.preloaded_images.items():
-            for i, image_data in enumerate(images):
-                if image_data['original'] is None and 'error' in image_data['info']:
-                    retried_count += 1
-                    url = image_data['info']['url']
-                    self.root.after(0, self.update_status, f"Retrying {window} image {i + 1}...")
+        self.retry_failed_loads()
+
+    def retry_failed_loads(self, automatic=False):
+        # F5 and the automatic retry both put failed images back on the download queue, so
+        # they get the engine's backoff, circuit breaker and concurrency. The automatic one
+        # skips errors that won't go away by themselves (404, 403, undecodable files).
+        if self.auto_retry_job:
+            self.root.after_cancel(self.auto_retry_job)
+            self.auto_retry_job = None
+
+        retried = []
+        for record in self.catalog.failed_records():
+            if record.info.get('retryable') or not automatic:
+                self.catalog.mark_pending(record)
+                retried.append((record.window, record.index))
+        if not retried:
+            return
 
-                    try:
-                        response = requests.get(url, timeout=30,
-                                                headers={'User-Agent': 'Mozilla/5.0'})
-                        response.raise_for_status()
-                        pil_img = Image.open(BytesIO(response.content))
-
-                        images[i] = {
-                            'original': pil_img,
-                            'display': None,
-                            'info': {
-                                'size': pil_img.size,
-                                'format': pil_img.format,
-                                'mode': pil_img.mode,
-                                'url': url
-                            }
-                        }
-                        recovered_count += 1
-                    except Exception as e:
-                        print(f"Retry failed for {url}: {e}")
-
-        self.failed_images -= recovered_count
-
-        self.root.after(0, self.retry_complete, retried_count, recovered_count)
-
-    def retry_complete(self, retried_count, recovered_count):
+        if self.retry_batch is None:
+            self.retry_batch = {'keys': set(), 'retried': 0, 'recovered': 0, 'automatic': automatic}
+        self.retry_batch['keys'].update(retried)
+        self.retry_batch['retried'] += len(retried)
+        self.retry_batch['automatic'] = self.retry_batch['automatic'] and automatic
+        for window in dict.fromkeys(window for window, _ in retried):
+            self.request_window(window, PRIORITY_VISIBLE if window == self.current_window else PRIORITY_BACKGROUND)
+
+    def schedule_auto_retry(self):
+        # Returns True if a background retry round is now scheduled
+        if not AUTO_RETRY_FAILED or self.auto_retry_rounds >= AUTO_RETRY_ROUNDS:
+            return False
+        if self.auto_retry_job:
+            return True
+        if not any(record.info.get('retryable') for record in self.catalog.failed_records()):
+            return False
+        delay = AUTO_RETRY_DELAY * 2 ** self.auto_retry_rounds
+        self.auto_retry_rounds += 1
+        self.auto_retry_job = self.root.after(int(delay * 1000), self.retry_failed_loads, True)
+        return True
+
+    def retry_complete(self, batch):
+        retried_count, recovered_count = batch['retried'], batch['recovered']
         self.update_status(f"Retry complete: {recovered_count}/{retried_count} images recovered")
+        auto_retry = self.schedule_auto_retry()
+        if batch['automatic']:
+            # Background rounds only report through the status bar
+            return
         if recovered_count > 0:
             messagebox.showinfo("Retry Complete",
                                f"Successfully recovered {recovered_count} out of {retried_count} failed images!")
-        else:
+        elif not auto_retry:
             messagebox.showwarning("Retry Complete",
                                    f"Unable to recover any of the {retried_count} failed images.\n"
                                    f"This may be due to network issues or invalid URLs.")
+        else:
+            messagebox.showwarning("Retry Complete",
+                                   f"Unable to recover any of the {retried_count} failed images yet.\n"
+                                   f"Temporary failures will be retried automatically in the background.")
 
     def draw_cupola(self):
-        self.canvas.delete("all")
+        # The overview's items are created once; a redraw only moves and rescales them when
+        # the canvas size changed, and only rewrites the labels whose text changed
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
 
@@ -381,39 +2340,67 @@ class ISS_Cupola_Viewer:
             self.root.after(100, self.draw_cupola)
             return
 
-        center_x = canvas_width // 2
-        center_y = canvas_height // 2
-
-        scale_factor = min(canvas_width, canvas_height) / 600
-        circle_r = int(60 * scale_factor)
-        self.canvas.create_text(center_x, 50, text="ISS Cupola Earth Observation Dome",
-                                fill="white", font=("Arial", int(16 * scale_factor), "bold"))
-        success_count = self.total_images - self.failed_images
-        subtitle = f"{success_count} High-Resolution Earth Images from Space"
-        self.canvas.create_text(center_x, 75, text=subtitle,
-                                fill="#888888", font=("Arial", int(12 * scale_factor)))
+        if not self.cupola_items:
+            self.build_cupola()
+        if (canvas_width, canvas_height) != self.cupola_layout:
+            self.cupola_layout = (canvas_width, canvas_height)
+            self.layout_cupola(canvas_width, canvas_height)
+        self.label_cupola()
 
-        circle = self.canvas.create_oval(center_x - circle_r, center_y - circle_r,
-                                         center_x + circle_r, center_y + circle_r,
-                                         fill="#2a2a2a", outline="#4a90e2", width=3, tags="window_0")
+    def build_cupola(self):
+        items = self.cupola_items
+        items['title'] = self.canvas.create_text(0, 0, text="ISS Cupola Earth Observation Dome", fill="white")
+        items['subtitle'] = self.canvas.create_text(0, 0, fill="#888888")
 
+        circle = self.canvas.create_oval(0, 0, 0, 0, fill="#2a2a2a", outline="#4a90e2", width=3, tags="window_0")
+        items['window_0'] = circle
         self.canvas.tag_bind(circle, "<Button-1>", lambda e: self.show_image("Window 0"))
         self.canvas.tag_bind(circle, "<Enter>", lambda e: self.on_window_hover("Window 0"))
         self.canvas.tag_bind(circle, "<Leave>", lambda e: self.on_window_leave())
+        items['window_0_name'] = self.canvas.create_text(0, 0, text="Window 0", fill="white", tags="window_0_text")
+        items['window_0_count'] = self.canvas.create_text(0, 0, fill="#888888", tags="window_0_text")
 
-        available_count = sum(1 for img in self.preloaded_images.get("Window 0", []) if img['original'] is not None)
-        self.canvas.create_text(center_x, center_y - 10, text="Window 0",
-                                fill="white", font=("Arial", int(12 * scale_factor), "bold"), tags="window_0_text")
-        self.canvas.create_text(center_x, center_y + 8, text=f"({available_count} images)",
-                                fill="#888888", font=("Arial", int(9 * scale_factor)), tags="window_0_text")
+        for i in range(1, 7):
+            win_key = f"Window {i}"
+            window_id = f"window_{i}"
+
+            trap = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, fill="#3a3a3a", outline="#4a90e2", width=2,
+                                              tags=window_id)
+            items[window_id] = trap
+            self.canvas.tag_bind(trap, "<Button-1>", lambda e, w=win_key: self.show_image(w))
+            self.canvas.tag_bind(trap, "<Enter>", lambda e, w=win_key: self.on_window_hover(w))
+            self.canvas.tag_bind(trap, "<Leave>", lambda e: self.on_window_leave())
+
+            items[f"{window_id}_name"] = self.canvas.create_text(0, 0, text=f"W{i}", fill="white",
+                                                                 tags=f"{window_id}_text")
+            items[f"{window_id}_count"] = self.canvas.create_text(0, 0, fill="#888888", tags=f"{window_id}_text")
+
+        items['instructions'] = self.canvas.create_text(0, 0, fill="#888888")
+
+    def layout_cupola(self, canvas_width, canvas_height):
+        items = self.cupola_items
+        center_x = canvas_width // 2
+        center_y = canvas_height // 2
+
+        scale_factor = min(canvas_width, canvas_height) / 600
+        circle_r = int(60 * scale_factor)
+        self.canvas.coords(items['title'], center_x, 50)
+        self.canvas.itemconfig(items['title'], font=("Arial", int(16 * scale_factor), "bold"))
+        self.canvas.coords(items['subtitle'], center_x, 75)
+        self.canvas.itemconfig(items['subtitle'], font=("Arial", int(12 * scale_factor)))
+
+        self.canvas.coords(items['window_0'], center_x - circle_r, center_y - circle_r,
+                           center_x + circle_r, center_y + circle_r)
+        self.canvas.coords(items['window_0_name'], center_x, center_y - 10)
+        self.canvas.itemconfig(items['window_0_name'], font=("Arial", int(12 * scale_factor), "bold"))
+        self.canvas.coords(items['window_0_count'], center_x, center_y + 8)
+        self.canvas.itemconfig(items['window_0_count'], font=("Arial", int(9 * scale_factor)))
 
         trap_w_top = int(50 * scale_factor)
         trap_w_bottom = int(90 * scale_factor)
         trap_h = int(60 * scale_factor)
         radius = int(140 * scale_factor)
 
-        window_names = ["Window 1", "Window 2", "Window 3", "Window 4", "Window 5", "Window 6"]
-
         for i in range(6):
             angle = math.radians(i * 60 - 90)
             cx = center_x + radius * math.cos(angle)
@@ -430,84 +2417,98 @@ class ISS_Cupola_Viewer:
                 cx - trap_w_bottom / 2 * px + trap_h / 2 * dx, cy - trap_w_bottom / 2 * py + trap_h / 2 * dy
             ]
 
-            win_key = window_names[i]
             window_id = f"window_{i + 1}"
-
-            trap = self.canvas.create_polygon(points, fill="#3a3a3a", outline="#4a90e2", width=2, tags=window_id)
-
-            self.canvas.tag_bind(trap, "<Button-1>", lambda e, w=win_key: self.show_image(w))
-            self.canvas.tag_bind(trap, "<Enter>", lambda e, w=win_key: self.on_window_hover(w))
-            self.canvas.tag_bind(trap, "<Leave>", lambda e: self.on_window_leave())
-
-            available_count = sum(1 for img in self.preloaded_images.get(win_key, []) if img['original'] is not None)
-
-            self.canvas.create_text(cx, cy - 8, text=win_key.replace("Window ", "W"),
-                                    fill="white", font=("Arial", int(10 * scale_factor), "bold"), tags=f"{window_id}_text")
-            self.canvas.create_text(cx, cy + 8, text=f"({available_count})",
-                                    fill="#888888", font=("Arial", int(8 * scale_factor)), tags=f"{window_id}_text")
+            self.canvas.coords(items[window_id], *points)
+            self.canvas.coords(items[f"{window_id}_name"], cx, cy - 8)
+            self.canvas.itemconfig(items[f"{window_id}_name"], font=("Arial", int(10 * scale_factor), "bold"))
+            self.canvas.coords(items[f"{window_id}_count"], cx, cy + 8)
+            self.canvas.itemconfig(items[f"{window_id}_count"], font=("Arial", int(8 * scale_factor)))
+
+        self.canvas.coords(items['instructions'], center_x, canvas_height - 30)
+        self.canvas.itemconfig(items['instructions'], font=("Arial", int(10 * scale_factor)))
+
+    def label_cupola(self):
+        labels = {
+            'subtitle': f"{self.catalog.loaded} High-Resolution Earth Images from Space",
+            'window_0_count': f"({self.catalog.count('Window 0', 'loaded')} images)",
+        }
+        for i in range(1, 7):
+            labels[f"window_{i}_count"] = f"({self.catalog.count(f'Window {i}', 'loaded')})"
 
         instructions = "Click any window to view Earth imagery • Arrow keys navigate • F1 for help"
-        if self.failed_images > 0:
-            instructions += f" • F5 to retry {self.failed_images} failed images"
+        if self.catalog.failed > 0:
+            instructions += f" • F5 to retry {self.catalog.failed} failed images"
+        labels['instructions'] = instructions
 
-        self.canvas.create_text(center_x, canvas_height - 30, text=instructions,
-                                fill="#888888", font=("Arial", int(10 * scale_factor)))
+        for name, text in labels.items():
+            if self.cupola_labels.get(name) != text:
+                self.cupola_labels[name] = text
+                self.canvas.itemconfig(self.cupola_items[name], text=text)
 
     def on_window_hover(self, window_key):
         self.canvas.config(cursor="hand2")
-        available_count = sum(1 for img in self.preloaded_images.get(window_key, []) if img['original'] is not None)
-        failed_count = sum(1 for img in self.preloaded_images.get(window_key, []) if img['original'] is None)
+        self.hovered_window = window_key
+        self.request_window(window_key, PRIORITY_HOVER)
+
+        available_count = self.catalog.count(window_key, 'loaded')
+        failed_count = self.catalog.count(window_key, 'failed')
+        pending_count = self.catalog.count(window_key, 'pending')
 
         status = f"Hover: {window_key} - {available_count} images available"
         if failed_count > 0:
             status += f" ({failed_count} failed)"
+        if pending_count > 0:
+            status += f" ({pending_count} loading)"
 
         self.update_status(status)
 
     def on_window_leave(self):
         self.canvas.config(cursor="")
-        success_count = self.total_images - self.failed_images
-        self.update_status(f"Ready - {success_count} images loaded successfully")
+        if self.hovered_window and self.hovered_window != self.current_window:
+            self.release_window(self.hovered_window)
+        self.hovered_window = None
+        self.update_status(f"Ready - {self.catalog.loaded} images loaded successfully")
 
-    def show_image(self, window_key, idx=0):
-        if window_key not in self.preloaded_images or not self.preloaded_images[window_key]:
+    def show_image(self, window_key, idx=0, keep_slideshow=False):
+        if not self.catalog.records(window_key):
             self.update_status(f"No images available for {window_key}")
             return
 
-        available_images = [(i, img) for i, img in enumerate(self.preloaded_images[window_key])
-                            if img['original'] is not None]
+        if self.current_window and self.current_window != window_key:
+            self.release_window(self.current_window)
+        self.request_window(window_key, PRIORITY_VISIBLE)
 
-        if not available_images:
-            messagebox.showwarning("No Images", f"All images for {window_key} failed to load.\n\nPress F5 to retry loading.")
+        if not self.catalog.count(window_key, 'loaded'):
+            pending = self.catalog.first(window_key, 'pending')
+            if pending is not None:
+                self.show_pending_window(window_key, pending)
+                return
+            self.warn_window_failed(window_key)
             return
 
-        if idx >= len(available_images) or self.preloaded_images[window_key][idx]['original'] is None:
-            idx = available_images[0][0]
-
-        image_data = self.preloaded_images[window_key][idx]
-        if image_data['original'] is None:
-            self.update_status(f"Failed to load image {idx + 1} for {window_key}")
-            return
+        if idx >= len(self.catalog.records(window_key)) or self.catalog.get(window_key, idx).image_id is None:
+            idx = self.catalog.first(window_key, 'loaded')
+        record = self.catalog.get(window_key, idx)
 
         self.current_window = window_key
         self.current_index = idx
 
-        if self.slideshow_active:
+        if self.slideshow_active and not keep_slideshow:
             self.toggle_slideshow()
 
         self.reset_view(False)
-        self.update_image_display()
+        self.request_redraw()
 
         self.canvas.pack_forget()
         self.image_frame.pack(fill="both", expand=True)
         self.show_toolbar()
 
-        available_images_count = sum(1 for img in self.preloaded_images[window_key] if img['original'] is not None)
-        current_available_index = sum(1 for i, img in enumerate(self.preloaded_images[window_key][:idx + 1]) if img['original'] is not None)
+        available_images_count = self.catalog.count(window_key, 'loaded')
+        current_available_index = self.catalog.position(window_key, idx)
 
         self.window_info.config(text=f"{window_key} - Image {current_available_index}/{available_images_count}")
 
-        img_info = image_data['info']
+        img_info = record.info
         self.image_info_label.config(
             text=f"Size: {img_info['size'][0]}x{img_info['size'][1]} | "
                  f"Format: {img_info.get('format', 'Unknown')} | Mode: {img_info.get('mode', 'Unknown')}"
@@ -515,26 +2516,108 @@ class ISS_Cupola_Viewer:
 
         self.update_status(f"Viewing {window_key} - Use arrow keys or buttons to navigate")
 
-    def update_image_display(self):
-        if not self.current_window:
+    def prefetch_neighbours(self, view_size):
+        # Pre-render the images next/prev/slideshow would show, at this viewport size and the
+        # view state show_image resets to, so advancing is a frame cache hit. Nearest first;
+        # the look-ahead stops once the frames or their decoded sources would crowd out
+        # half of the frame cache or the image store.
+        window = self.current_window
+        if self.catalog.get(window, self.current_index).image_id is None or self.catalog.count(window, 'loaded') <= 1:
+            self.prefetcher.cancel()
             return
 
-        image_data = self.preloaded_images[self.current_window][self.current_index]
-        if image_data['original'] is None:
-            return
+        behind = 0 if self.slideshow_active else PREFETCH_BEHIND
+        offsets = []
+        for step in range(1, max(PREFETCH_AHEAD, behind) + 1):
+            if step <= PREFETCH_AHEAD:
+                offsets.append(step)
+            if step <= behind:
+                offsets.append(-step)
+
+        jobs, seen = [], {self.current_index}
+        frame_bytes = source_bytes = 0
+        for offset in offsets:
+            idx = self.catalog.step(window, self.current_index, offset)
+            if idx in seen:
+                continue
+            seen.add(idx)
+            record = self.catalog.get(window, idx)
+            view = self.view_state(record, view_size, 1.0, 0, 1.0, 1.0, (0, 0))
+            if view is None:
+                continue
+            frame_key, args, _ = view
+            out_width, out_height = args[-1]
+            width, height = record.info['size']
+            # Four bytes a pixel is an upper bound for every mode the store keeps
+            frame_bytes += out_width * out_height * 4
+            source_bytes += width * height * 4
+            if jobs and (frame_bytes > RENDER_CACHE_BYTES // 2 or source_bytes > IMAGE_MEMORY_BUDGET // 2):
+                break
+            jobs.append((frame_key, args))
+        self.prefetcher.schedule(jobs)
+
+    def warn_window_failed(self, window_key):
+        messagebox.showwarning("No Images", f"All images for {window_key} failed to load.\n\nPress F5 to retry loading.")
+
+    def show_pending_window(self, window_key, idx):
+        # image_loaded swaps in the first image of this window as soon as it arrives
+        self.render_worker.cancel_pending()
+        self.current_window = window_key
+        self.current_index = idx
 
-        pil_img = image_data['original'].copy()
+        if self.slideshow_active:
+            self.toggle_slideshow()
 
-        if self.brightness != 1.0:
-            enhancer = ImageEnhance.Brightness(pil_img)
-            pil_img = enhancer.enhance(self.brightness)
+        self.clear_view()
+        self.image_canvas.create_text(self.image_canvas.winfo_reqwidth() // 2,
+                                      self.image_canvas.winfo_reqheight() // 2,
+                                      text=f"Loading {window_key} from Google Drive...",
+                                      fill="white", font=("Arial", 12), tags="view")
+        self.canvas.pack_forget()
+        self.image_frame.pack(fill="both", expand=True)
+        self.show_toolbar()
 
-        if self.contrast != 1.0:
-            enhancer = ImageEnhance.Contrast(pil_img)
-            pil_img = enhancer.enhance(self.contrast)
+        self.window_info.config(text=f"{window_key} - Loading...")
+        self.image_info_label.config(text="")
+        self.update_status(f"Fetching {window_key} first - other windows continue in the background")
+
+    def view_state(self, record, view_size, zoom_factor, rotation_angle, brightness, contrast, pan):
+        # Work out the zoomed, rotated image size from the full-resolution dimensions; only
+        # the part of it that fits the viewport is rendered. Returns the frame cache key, the
+        # renderer arguments and the pan clamped to the image edges, or None if nothing fits.
+        img_width, img_height = record.info['size']
+        if rotation_angle % 180 == 90:
+            img_width, img_height = img_height, img_width
+        view_width, view_height = view_size
+        if view_width <= 0 or view_height <= 0:
+            return None
+        base_scale = min(view_width / img_width, view_height / img_height) * zoom_factor
 
-        if self.rotation_angle != 0:
-            pil_img = pil_img.rotate(-self.rotation_angle, expand=True)
+        new_width = int(img_width * base_scale)
+        new_height = int(img_height * base_scale)
+        if new_width <= 0 or new_height <= 0:
+            return None
+
+        out_width, out_height = min(new_width, view_width), min(new_height, view_height)
+        max_x, max_y = new_width - out_width, new_height - out_height
+        origin_x = min(max(max_x // 2 - pan[0], 0), max_x)
+        origin_y = min(max(max_y // 2 - pan[1], 0), max_y)
+
+        # Toggling an enhancement back, rotating back or returning to an earlier window
+        # size lands on a view state that has already been rendered
+        frame_key = (record.image_id, rotation_angle, brightness, contrast,
+                     zoom_factor, (view_width, view_height), (origin_x, origin_y))
+        args = (record.image_id, (new_width, new_height), rotation_angle,
+                brightness, contrast, (origin_x, origin_y), (out_width, out_height))
+        return frame_key, args, (max_x // 2 - origin_x, max_y // 2 - origin_y)
+
+    def update_image_display(self):
+        if not self.current_window:
+            return
+
+        record = self.catalog.get(self.current_window, self.current_index)
+        if record.image_id is None:
+            return
 
         canvas_width = self.image_frame.winfo_width()
         canvas_height = self.image_frame.winfo_height() - 100
@@ -543,36 +2626,276 @@ class ISS_Cupola_Viewer:
             self.root.after(100, self.update_image_display)
             return
 
-        img_width, img_height = pil_img.size
-        scale_x = (canvas_width - 100) / img_width
-        scale_y = (canvas_height - 100) / img_height
-        base_scale = min(scale_x, scale_y) * self.zoom_factor
+        view_size = (canvas_width - 100, canvas_height - 100)
+        view = self.view_state(record, view_size, self.zoom_factor, self.rotation_angle,
+                               self.brightness, self.contrast, (self.pan_x, self.pan_y))
+        if view is None:
+            return
+        # Clamp the pan so dragging past an edge doesn't build up slack
+        frame_key, args, (self.pan_x, self.pan_y) = view
+        self.requested_state = frame_key[:-1]
 
-        new_width = int(img_width * base_scale)
-        new_height = int(img_height * base_scale)
+        zoom_percent = int(self.zoom_factor * 100)
+        self.zoom_label.config(text=f"{zoom_percent}%")
+
+        if self.view is not None and self.view['state'] == self.requested_state and not self.view['preview']:
+            # Only the pan differs from what's on the canvas, and scroll_view keeps that current
+            self.render_worker.cancel_pending()
+            self.fill_view_edges()
+            return
+
+        display_img = self.frame_cache.get(frame_key)
+        if display_img is not None:
+            self.render_worker.cancel_pending()
+            self.present_frame(display_img, frame_key, args, view_size)
+            if not self.interaction_active:
+                self.prefetch_neighbours(view_size)
+            return
+
+        if self.interaction_active:
+            # Mid-gesture: a cheap preview now, the full-quality frame once input goes quiet
+            preview = self.tile_renderer.render_preview(*args)
+            if preview is not None:
+                self.render_worker.cancel_pending()
+                self.present_frame(preview, frame_key, args, view_size, preview=True)
+                return
+
+        # Everything below runs on the render thread; Pillow drops the GIL inside
+        # resample/point/transpose, so Tk keeps handling input meanwhile
+        self.render_worker.submit(lambda: self.render_frame(frame_key, args, view_size))
+
+    def render_frame(self, frame_key, args, view_size):
+        # Render thread: if the prefetcher already has this frame in hand, wait for it
+        # instead of rendering it a second time
+        self.prefetcher.claim(frame_key)
+        frame = self.frame_cache.get(frame_key)
+        if frame is None:
+            frame = self.frame_cache.put(frame_key, self.tile_renderer.render(*args))
+        return frame, frame_key, args, view_size
+
+    def on_frame_rendered(self, generation, frame, error):
+        try:
+            self.root.after(0, self.frame_rendered, generation, frame, error)
+        except (RuntimeError, tk.TclError):
+            pass
+
+    def frame_rendered(self, generation, result, error):
+        if not self.render_worker.is_current(generation) or not self.current_window:
+            return
+        if error is not None:
+            print(f"Error rendering {self.current_window} image {self.current_index + 1}: {error}")
+            return
+        frame, frame_key, args, view_size = result
+        self.present_frame(frame, frame_key, args, view_size)
+        # The current frame is up; use the idle time to get the next ones ready
+        self.prefetch_neighbours(view_size)
+
+    def present_frame(self, display_img, frame_key, args, view_size, preview=False):
+        # The image canvas shows one view state (image, zoom, rotation, enhancements,
+        # viewport size) at a time. Items are placed at their display-space position minus
+        # the view origin, so a pan is a canvas move and a frame rendered for an older
+        # origin still lands in the right place.
+        state, (origin_x, origin_y) = frame_key[:-1], frame_key[-1]
+        out_width, out_height = args[-1]
+        if self.view is None or self.view['state'] != state:
+            self.clear_view()
+            self.image_canvas.config(width=view_size[0], height=view_size[1])
+            self.view = {
+                'state': state,
+                'args': args,
+                'origin': (origin_x, origin_y),
+                'offset': ((view_size[0] - out_width) // 2, (view_size[1] - out_height) // 2),
+                'frame_item': None,
+                'frame_rect': None,
+                'preview': preview,
+                'tiles': {},
+                'requested': set()
+            }
+        view = self.view
+
+        tk_img = self.photo_pool.photo_for(display_img)
+        x, y = self.canvas_position(origin_x, origin_y)
+        if view['frame_item'] is None:
+            view['frame_item'] = self.image_canvas.create_image(x, y, image=tk_img, anchor="nw", tags="view")
+        else:
+            self.image_canvas.coords(view['frame_item'], x, y)
+            self.image_canvas.itemconfig(view['frame_item'], image=tk_img)
+        view['frame_photo'] = tk_img
+        view['frame_rect'] = (origin_x, origin_y, origin_x + out_width, origin_y + out_height)
+        view['preview'] = preview
+        if not preview:
+            for coord in [c for c in view['tiles'] if self.frame_covers(c)]:
+                self.drop_tile(coord)
+
+    def canvas_position(self, display_x, display_y):
+        origin_x, origin_y = self.view['origin']
+        offset_x, offset_y = self.view['offset']
+        return display_x - origin_x + offset_x, display_y - origin_y + offset_y
+
+    def scroll_view(self, dx, dy):
+        # Pan without touching pixels: slide everything on the canvas, then fill in
+        # whatever scrolled into view
+        view = self.view
+        display_width, display_height = view['args'][1]
+        out_width, out_height = view['args'][-1]
+        origin_x, origin_y = view['origin']
+        new_x = min(max(origin_x - dx, 0), display_width - out_width)
+        new_y = min(max(origin_y - dy, 0), display_height - out_height)
+        if (new_x, new_y) == (origin_x, origin_y):
+            return
+
+        self.image_canvas.move("view", origin_x - new_x, origin_y - new_y)
+        view['origin'] = (new_x, new_y)
+        self.pan_x = (display_width - out_width) // 2 - new_x
+        self.pan_y = (display_height - out_height) // 2 - new_y
+        self.fill_view_edges()
+
+    def fill_view_edges(self):
+        # Keep tiles within one tile of the viewport wherever the frame doesn't already
+        # cover it, so a drag rarely reaches unrendered canvas; tiles further out are dropped
+        view = self.view
+        size = self.tile_renderer.tile_size
+        image_id, display_size, rotation, brightness, contrast = view['args'][:5]
+        out_width, out_height = view['args'][-1]
+        origin_x, origin_y = view['origin']
+        x0, y0 = max(origin_x - size, 0), max(origin_y - size, 0)
+        x1 = min(origin_x + out_width + size, display_size[0])
+        y1 = min(origin_y + out_height + size, display_size[1])
+        wanted = {(tx, ty) for ty in range(y0 // size, (y1 - 1) // size + 1)
+                  for tx in range(x0 // size, (x1 - 1) // size + 1)}
+
+        for coord in [c for c in view['tiles'] if c not in wanted]:
+            self.drop_tile(coord)
+        missing = [c for c in sorted(wanted) if c not in view['tiles'] and not self.frame_covers(c)]
+        # A new request supersedes the one in flight, so only send one when the drag
+        # has reached tiles that weren't asked for yet
+        if missing and not set(missing) <= view['requested']:
+            view['requested'] = set(missing)
+            state = view['state']
+            self.tile_worker.submit(lambda: (state, self.tile_renderer.render_tiles(
+                image_id, display_size, rotation, brightness, contrast, missing)))
+
+    def frame_covers(self, coord):
+        view = self.view
+        if view['frame_rect'] is None or view['preview']:
+            return False
+        size = self.tile_renderer.tile_size
+        display_width, display_height = view['args'][1]
+        left, top, right, bottom = view['frame_rect']
+        x0, y0 = coord[0] * size, coord[1] * size
+        x1, y1 = min(x0 + size, display_width), min(y0 + size, display_height)
+        return left <= x0 and top <= y0 and x1 <= right and y1 <= bottom
+
+    def on_tiles_rendered(self, generation, result, error):
+        try:
+            self.root.after(0, self.tiles_rendered, generation, result, error)
+        except (RuntimeError, tk.TclError):
+            pass
+
+    def tiles_rendered(self, generation, result, error):
+        if not self.tile_worker.is_current(generation) or self.view is None:
+            return
+        if error is not None:
+            print(f"Error rendering tiles for {self.current_window} image {self.current_index + 1}: {error}")
+            return
+        state, tiles = result
+        view = self.view
+        if view['state'] != state:
+            return
 
-        if new_width > 0 and new_height > 0:
-            display_img = pil_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            tk_img = ImageTk.PhotoImage(display_img)
+        view['requested'] = set()
+        size = self.tile_renderer.tile_size
+        for coord, tile in tiles:
+            if coord in view['tiles'] or self.frame_covers(coord):
+                continue
+            photo = self.photo_pool.acquire(tile)
+            x, y = self.canvas_position(coord[0] * size, coord[1] * size)
+            item = self.image_canvas.create_image(x, y, image=photo, anchor="nw", tags="view")
+            view['tiles'][coord] = (item, photo, (tile.mode, tile.size))
+
+    def drop_tile(self, coord):
+        item, photo, key = self.view['tiles'].pop(coord)
+        self.image_canvas.delete(item)
+        self.photo_pool.release(key, photo)
+
+    def clear_view(self):
+        self.tile_worker.cancel_pending()
+        if self.view is not None:
+            for coord in list(self.view['tiles']):
+                self.drop_tile(coord)
+        self.image_canvas.delete("view")
+        self.view = None
+
+    def mark_interaction(self):
+        self.interaction_active = True
+        if self.refine_job:
+            self.root.after_cancel(self.refine_job)
+        self.refine_job = self.root.after(INTERACTION_IDLE_MS, self.end_interaction)
+
+    def end_interaction(self):
+        self.refine_job = None
+        self.interaction_active = False
+        if self.current_window:
+            self.request_redraw()
+
+    def render_stats(self):
+        return {
+            'images': self.image_store.stats(),
+            'tiles': self.tile_renderer.tiles.stats(),
+            'frames': self.frame_cache.stats(),
+            'photos': self.photo_pool.stats()
+        }
 
-            self.image_label.config(image=tk_img)
-            self.image_label.image = tk_img
-            zoom_percent = int(self.zoom_factor * 100)
-            self.zoom_label.config(text=f"{zoom_percent}%")
-            image_data['display'] = display_img
+    def telemetry_report(self):
+        report = TELEMETRY.snapshot()
+        caches = self.render_stats()
+        caches['disk'] = self.download_engine.cache.stats()
+        caches['redraws'] = {'requests': self.redraw_scheduler.requests, 'frames': self.redraw_scheduler.frames}
+        caches['prefetch'] = {'rendered': self.prefetcher.rendered}
+        caches['breaker'] = {'trips': self.download_engine.breaker.trips}
+        report['caches'] = caches
+        return report
+
+    def toggle_hud(self):
+        if self.hud_job:
+            self.root.after_cancel(self.hud_job)
+            self.hud_job = None
+            self.hud_label.pack_forget()
+            return
+        self.hud_label.pack(side="right", padx=10)
+        self.refresh_hud()
+
+    def refresh_hud(self):
+        # One line: network throughput, then the mean time of each stage that has run,
+        # then frame/tile cache hit rates
+        report = self.telemetry_report()
+        stages, counters, caches = report['stages'], report['counters'], report['caches']
+        transfer = stages.get('http.transfer', {}).get('total_s', 0)
+        parts = [f"net {counters.get('http.bytes', 0) / transfer / 1e6 if transfer else 0:.1f} MB/s"]
+        for stage, label in (('http.connect', 'conn'), ('http.wait', 'wait'), ('decode', 'dec'),
+                             ('render.resize', 'resize'), ('render.enhance', 'enh'), ('render.frame', 'frame'),
+                             ('photo.paste', 'photo')):
+            if stage in stages:
+                parts.append(f"{label} {stages[stage]['mean_ms']:.1f}ms")
+        parts.append(f"frames {caches['frames']['hit_rate']:.0%} tiles {caches['tiles']['hit_rate']:.0%}")
+        self.hud_label.config(text=" | ".join(parts))
+        self.hud_job = self.root.after(HUD_INTERVAL_MS, self.refresh_hud)
 
     def show_cupola(self):
         if self.slideshow_active:
             self.toggle_slideshow()
 
+        if self.current_window:
+            self.release_window(self.current_window)
+        self.render_worker.cancel_pending()
         self.current_window = None
+        self.clear_view()
         self.image_frame.pack_forget()
         self.canvas.pack(fill="both", expand=True)
         self.hide_toolbar()
-        self.draw_cupola()
+        self.request_redraw()
 
-        success_count = self.total_images - self.failed_images
-        self.update_status(f"Ready - {success_count} images loaded successfully")
+        self.update_status(f"Ready - {self.catalog.loaded} images loaded successfully")
         self.image_info_label.config(text="")
 
     def show_toolbar(self):
@@ -591,30 +2914,24 @@ class ISS_Cupola_Viewer:
                        self.slideshow_btn, self.fullscreen_btn, self.save_btn, self.refresh_btn, self.help_btn]:
             widget.pack_forget()
 
-    def next_image(self):
+    def next_image(self, keep_slideshow=False):
         if not self.current_window:
             return
 
-        available_indices = [i for i, img in enumerate(self.preloaded_images[self.current_window]) if img['original'] is not None]
-        if len(available_indices) <= 1:
+        if self.catalog.count(self.current_window, 'loaded') <= 1:
             return
 
-        current_pos = available_indices.index(self.current_index) if self.current_index in available_indices else 0
-        next_pos = (current_pos + 1) % len(available_indices)
-        next_index = available_indices[next_pos]
-        self.show_image(self.current_window, next_index)
+        next_index = self.catalog.step(self.current_window, self.current_index, 1)
+        self.show_image(self.current_window, next_index, keep_slideshow)
 
     def prev_image(self):
         if not self.current_window:
             return
 
-        available_indices = [i for i, img in enumerate(self.preloaded_images[self.current_window]) if img['original'] is not None]
-        if len(available_indices) <= 1:
+        if self.catalog.count(self.current_window, 'loaded') <= 1:
             return
 
-        current_pos = available_indices.index(self.current_index) if self.current_index in available_indices else 0
-        prev_pos = (current_pos - 1) % len(available_indices)
-        prev_index = available_indices[prev_pos]
+        prev_index = self.catalog.step(self.current_window, self.current_index, -1)
         self.show_image(self.current_window, prev_index)
 
     def toggle_slideshow(self):
@@ -640,45 +2957,47 @@ class ISS_Cupola_Viewer:
 
     def slideshow_next(self):
         if self.slideshow_active:
-            self.next_image()
+            self.next_image(keep_slideshow=True)
             self.schedule_next_slide()
 
     def zoom_in(self):
         if self.current_window:
             self.zoom_factor = min(self.zoom_factor * 1.2, 5.0)
-            self.update_image_display()
+            self.mark_interaction()
+            self.request_redraw()
 
     def zoom_out(self):
         if self.current_window:
             self.zoom_factor = max(self.zoom_factor / 1.2, 0.1)
-            self.update_image_display()
+            self.mark_interaction()
+            self.request_redraw()
 
     def reset_zoom(self):
         if self.current_window:
             self.zoom_factor = 1.0
             self.pan_x = 0
             self.pan_y = 0
-            self.update_image_display()
+            self.request_redraw()
 
     def rotate_left(self):
         if self.current_window:
             self.rotation_angle = (self.rotation_angle - 90) % 360
-            self.update_image_display()
+            self.request_redraw()
 
     def rotate_right(self):
         if self.current_window:
             self.rotation_angle = (self.rotation_angle + 90) % 360
-            self.update_image_display()
+            self.request_redraw()
 
     def adjust_brightness(self):
         if self.current_window:
             self.brightness = 1.5 if self.brightness == 1.0 else 1.0
-            self.update_image_display()
+            self.request_redraw()
 
     def adjust_contrast(self):
         if self.current_window:
             self.contrast = 1.5 if self.contrast == 1.0 else 1.0
-            self.update_image_display()
+            self.request_redraw()
 
     def reset_enhancements(self):
         if self.current_window:
@@ -686,7 +3005,7 @@ class ISS_Cupola_Viewer:
             self.contrast = 1.0
             self.rotation_angle = 0
             self.zoom_factor = 1.0
-            self.update_image_display()
+            self.request_redraw()
 
     def reset_view(self, update_display=True):
         self.zoom_factor = 1.0
@@ -696,7 +3015,7 @@ class ISS_Cupola_Viewer:
         self.brightness = 1.0
         self.contrast = 1.0
         if update_display:
-            self.update_image_display()
+            self.request_redraw()
 
     def start_pan(self, event):
         self.pan_start_x = event.x
@@ -704,10 +3023,19 @@ class ISS_Cupola_Viewer:
 
     def do_pan(self, event):
         if hasattr(self, 'pan_start_x'):
-            self.pan_x += event.x - self.pan_start_x
-            self.pan_y += event.y - self.pan_start_y
+            dx, dy = event.x - self.pan_start_x, event.y - self.pan_start_y
             self.pan_start_x = event.x
             self.pan_start_y = event.y
+            if self.view is not None and self.view['state'] == self.requested_state:
+                self.scroll_view(dx, dy)
+            else:
+                # The canvas is still showing another zoom level or image; pan the
+                # frame that's on its way instead
+                self.pan_x += dx
+                self.pan_y += dy
+                if self.current_window:
+                    self.mark_interaction()
+                    self.request_redraw()
 
     def end_pan(self, event):
         if hasattr(self, 'pan_start_x'):
@@ -743,12 +3071,20 @@ class ISS_Cupola_Viewer:
             messagebox.showwarning("No Image", "No image currently displayed to save.")
             return
 
-        image_data = self.preloaded_images[self.current_window][self.current_index]
-        if image_data['original'] is None:
+        record = self.catalog.get(self.current_window, self.current_index)
+        if record.image_id is None:
             messagebox.showerror("Error", "Current image could not be saved.")
             return
 
-        img_to_save = image_data.get('display') or image_data['original']
+        # The whole image at the zoom, rotation and tone being viewed, rendered from the
+        # store rather than taken from the viewport frame
+        view_size = (self.image_frame.winfo_width() - 100, self.image_frame.winfo_height() - 200)
+        view = self.view_state(record, view_size, self.zoom_factor, self.rotation_angle,
+                               self.brightness, self.contrast, (0, 0))
+        if view is None:
+            messagebox.showerror("Error", "Current image could not be saved.")
+            return
+        img_to_save = self.tile_renderer.render_image(*view[1][:5])
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         default_filename = f"ISS_Cupola_{self.current_window.replace(' ', '_')}_img{self.current_index+1}_{timestamp}.png"
@@ -783,6 +3119,7 @@ KEYBOARD SHORTCUTS:
 • Ctrl+R: Reset all view settings
 • F1: Show this help dialog
 • F5: Retry loading failed images
+• F3: Toggle performance HUD
 • +/- Keys: Zoom in/out
 • 0 Key: Reset zoom to 100%
 
@@ -853,11 +3190,14 @@ Enjoy your virtual journey aboard the International Space Station! 🛰️"""
         help_window.geometry(f"+{x}+{y}")
 
     def on_window_resize(self, event):
-        if event.widget == self.root:
-            if self.current_window:
-                self.root.after_idle(self.update_image_display)
-            else:
-                self.root.after_idle(self.draw_cupola)
+        # <Configure> bound on the root also fires for every child widget, and for
+        # moves that don't change the size; only a real root resize needs a redraw
+        if event.widget != self.root or (event.width, event.height) == self.last_root_size:
+            return
+        self.last_root_size = (event.width, event.height)
+        if self.current_window:
+            self.mark_interaction()
+        self.request_redraw()
 
     def update_status(self, message):
         self.status_label.config(text=message)
@@ -871,15 +3211,58 @@ Enjoy your virtual journey aboard the International Space Station! 🛰️"""
         except Exception as e:
             print(f"Application error: {e}")
             messagebox.showerror("Application Error", f"An unexpected error occurred:\n{str(e)}")
+        finally:
+            # The store reads from (and writes pyramids into) the engine's cache directory,
+            # which goes away with the engine when it is a scratch one
+            self.image_store.shutdown()
+            self.download_engine.shutdown()
+            self.render_worker.shutdown()
+            self.tile_worker.shutdown()
+            self.prefetcher.shutdown()
+            if self.bundle is not None:
+                self.bundle.close()
+            if self.telemetry_path:
+                try:
+                    write_report(self.telemetry_report(), self.telemetry_path)
+                    print(f"Telemetry written to {self.telemetry_path}")
+                except OSError as e:
+                    print(f"Could not write telemetry to {self.telemetry_path}: {e}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ISS Cupola Earth Viewer")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="image manifest (default: %(default)s)")
+    parser.add_argument("--telemetry", default=TELEMETRY_REPORT, metavar="PATH",
+                        help="write stage timings and cache statistics on exit (*.prom: Prometheus text, else JSON)")
+    parser.add_argument("--hud", action="store_true", default=SHOW_HUD, help="show live timings in the status bar")
+    parser.add_argument("--bundle", default=BUNDLE_PATH, metavar="PATH",
+                        help="view the images packed into this bundle instead of downloading them")
+    parser.add_argument("--pixel-cache", action="store_true", default=PIXEL_CACHE,
+                        help="keep decoded pixels on disk as memory-mapped files to skip decoding on later runs")
+    commands = parser.add_subparsers(dest="command")
+    sync_parser = commands.add_parser("sync", help="download missing or changed images and verify their checksums")
+    sync_parser.add_argument("--update", action="store_true",
+                             help="accept changed images and record their new size and checksum")
+    pack_parser = commands.add_parser("pack", help="pack every image in the manifest into one bundle for offline use")
+    pack_parser.add_argument("output", help="bundle file to write")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        sys.exit(1 if sync_manifest(args.manifest, args.update) else 0)
+    if args.command == "pack":
+        try:
+            pack_bundle(args.output, args.manifest)
+        except (OSError, ValueError, requests.RequestException) as e:
+            print(f"Packing failed: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
     print("🚀 Starting ISS Cupola Earth Viewer - Enhanced Edition")
     print("Loading high-resolution Earth imagery from the International Space Station...")
     print("Please wait while images are downloaded from Google Drive...\n")
 
     try:
-        app = ISS_Cupola_Viewer()
+        app = ISS_Cupola_Viewer(args.manifest, args.telemetry, args.hud, args.bundle, args.pixel_cache)
         app.run()
     except Exception as e:
         print(f"Failed to start application: {e}")
@@ -0,0 +1,364 @@
+import hashlib
+import http.server
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import herman2
+
+
+class LocalServer:
+    # Threaded HTTP/1.1 server on a free local port. Every path serves the same body; a
+    # per-path delay holds the response back, and ranged requests are answered with a 206
+    # when If-Range matches the ETag.
+    def __init__(self, body, delays=None, cut=()):
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        self.delays = delays or {}
+        self.cut = set(cut)
+        self.requests = []
+        self.validated = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append((self.path, self.headers.get('Range'), self.headers.get('If-Range')))
+                    if self.headers.get('If-None-Match'):
+                        server.validated.append(self.path)
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    time.sleep(server.delays.get(self.path, 0))
+                    self.respond()
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def respond(self):
+                body, start = server.body, 0
+                match = re.match(r'bytes=(\d+)-$', self.headers.get('Range') or "")
+                if match and self.headers.get('If-Range') == server.etag:
+                    start = int(match.group(1))
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+                else:
+                    self.send_response(200)
+                self.send_header('ETag', server.etag)
+                self.send_header('Content-Length', str(len(body) - start))
+                self.end_headers()
+                if self.path in server.cut:
+                    # Drop the connection halfway through the first response
+                    server.cut.discard(self.path)
+                    self.wfile.write(body[start:len(body) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                self.wfile.write(body[start:])
+
+        return Handler
+
+
+class EngineTestCase(unittest.TestCase):
+    # A cache in a scratch directory, and start() for the server and engine under test
+    def setUp(self):
+        self.body = os.urandom(256 * 1024)
+        self.digest = hashlib.sha256(self.body).hexdigest()
+        self.cache_dir = tempfile.mkdtemp(prefix="iss_cupola_test_")
+        self.cache = herman2.DiskCache(self.cache_dir)
+        self.server = None
+        self.engine = None
+
+    def tearDown(self):
+        if self.engine is not None:
+            self.engine.shutdown()
+        if self.server is not None:
+            self.server.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def start(self, delays=None, cut=(), **engine_args):
+        self.server = LocalServer(self.body, delays, cut)
+        self.engine = herman2.DownloadEngine(cache=self.cache, retry_policy=herman2.RetryPolicy(base_delay=0.01),
+                                             **engine_args)
+
+    def fetch_all(self, paths, priority=herman2.PRIORITY_BACKGROUND):
+        futures = [self.engine.submit(self.server.url(path), priority) for path in paths]
+        for future in futures:
+            digest, path = future.result(timeout=10)
+            self.assertEqual(digest, self.digest)
+            self.assertEqual(herman2.file_sha256(path), self.digest)
+
+
+class WorkerPoolTest(EngineTestCase):
+    def test_per_host_limit_under_delayed_responses(self):
+        paths = [f"/slow{i}" for i in range(6)]
+        self.start(delays={path: 0.2 for path in paths}, max_workers=6, per_host=2)
+
+        self.fetch_all(paths)
+
+        self.assertEqual(len(self.server.requests), len(paths))
+        self.assertEqual(self.server.max_active, 2)
+
+    def test_worker_count_bounds_concurrency(self):
+        paths = [f"/slow{i}" for i in range(6)]
+        self.start(delays={path: 0.2 for path in paths}, max_workers=3, per_host=6)
+
+        started = time.monotonic()
+        self.fetch_all(paths)
+
+        self.assertEqual(self.server.max_active, 3)
+        # Two rounds of three, not six one after another
+        self.assertLess(time.monotonic() - started, 6 * 0.2)
+
+
+class SingleFlightTest(EngineTestCase):
+    def test_duplicate_submissions_share_one_download(self):
+        self.start(delays={'/same': 0.2})
+
+        futures = [self.engine.submit(self.server.url('/same'), herman2.PRIORITY_BACKGROUND) for _ in range(3)]
+        self.assertEqual({future.result(timeout=10)[0] for future in futures}, {self.digest})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_drive_url_shapes_share_one_download(self):
+        self.start(delays={'/uc?id=abc&export=download': 0.2})
+
+        futures = {self.engine.submit(self.server.url(path)) for path in ('/uc?id=abc&export=download', '/open?id=abc')}
+        self.assertEqual(len(futures), 1)
+        self.assertEqual(futures.pop().result(timeout=10)[0], self.digest)
+        self.assertEqual([path for path, _, _ in self.server.requests], ['/uc?id=abc&export=download'])
+
+    def test_identical_content_is_decoded_once(self):
+        path = os.path.join(self.cache_dir, "image.png")
+        herman2.Image.new('RGB', (64, 48), (10, 20, 30)).save(path)
+        digest = herman2.file_sha256(path)
+        store = herman2.ImageStore()
+        self.addCleanup(store.shutdown)
+
+        self.assertEqual(store.add(digest, path), store.add(digest, path))
+        self.assertIs(store.get(digest), store.get(digest))
+        self.assertEqual(store.stats()['images'], 1)
+
+
+class PriorityQueueTest(EngineTestCase):
+    def start_busy(self):
+        # A single worker, kept busy with /first while the test queues more jobs
+        self.start(delays={'/first': 0.3}, max_workers=1, per_host=1)
+        first = self.engine.submit(self.server.url('/first'), herman2.PRIORITY_BACKGROUND)
+        time.sleep(0.1)
+        return first
+
+    def served(self):
+        return [path for path, _, _ in self.server.requests]
+
+    def test_queue_serves_higher_priority_first(self):
+        first = self.start_busy()
+        queued = [self.engine.submit(self.server.url(path), herman2.PRIORITY_BACKGROUND)
+                  for path in ('/bg1', '/bg2')]
+        visible = self.engine.submit(self.server.url('/visible'), herman2.PRIORITY_VISIBLE)
+        for future in [first, visible] + queued:
+            self.assertEqual(future.result(timeout=10)[0], self.digest)
+
+        self.assertEqual(self.served(), ['/first', '/visible', '/bg1', '/bg2'])
+
+    def test_reprioritized_job_moves_up(self):
+        first = self.start_busy()
+        queued = [self.engine.submit(self.server.url(path), herman2.PRIORITY_BACKGROUND)
+                  for path in ('/bg1', '/bg2', '/hovered')]
+        self.engine.reprioritize([self.server.url('/hovered')], herman2.PRIORITY_HOVER)
+        for future in [first] + queued:
+            future.result(timeout=10)
+
+        self.assertEqual(self.served(), ['/first', '/hovered', '/bg1', '/bg2'])
+
+    def test_cancelled_job_is_never_requested(self):
+        first = self.start_busy()
+        kept = self.engine.submit(self.server.url('/kept'), herman2.PRIORITY_BACKGROUND)
+        dropped = self.engine.submit(self.server.url('/dropped'), herman2.PRIORITY_BACKGROUND)
+        self.engine.cancel([self.server.url('/dropped')])
+        first.result(timeout=10)
+        kept.result(timeout=10)
+
+        self.assertTrue(dropped.cancelled())
+        self.assertEqual(self.served(), ['/first', '/kept'])
+        # A new submission after the cancel starts a fresh job
+        self.assertEqual(self.engine.submit(self.server.url('/dropped')).result(timeout=10)[0], self.digest)
+
+
+class DownloadEngineTest(EngineTestCase):
+    def test_refresh_submission_skips_the_cached_copy(self):
+        self.start()
+        url = self.server.url('/sync')
+
+        self.engine.submit(url).result(timeout=10)
+        self.engine.submit(url).result(timeout=10)
+        self.engine.submit(url, refresh=True).result(timeout=10)
+
+        # Only the plain resubmission revalidates; refresh asks for the whole file again
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.validated, ['/sync'])
+
+    def test_removed_entry_is_downloaded_again(self):
+        self.start()
+        url = self.server.url('/page')
+
+        first = self.engine.fetch(url)
+        self.assertEqual(self.engine.fetch(url), first)
+        self.cache.remove(herman2.cache_key(url))
+        self.assertIsNone(self.cache.lookup(herman2.cache_key(url)))
+        self.assertFalse(os.path.exists(first[1]))
+        self.assertEqual(self.engine.fetch(url), first)
+
+        # The second fetch revalidated the cached copy; the one after remove() could not
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.validated, ['/page'])
+
+    def test_pyramids_go_with_their_object(self):
+        cache = herman2.DiskCache(os.path.join(self.cache_dir, "small"), max_bytes=len(self.body) + 1)
+
+        def pyramid(digest):
+            directory = os.path.join(cache.pyramids_dir, digest[:2], digest)
+            os.makedirs(directory)
+            return directory
+
+        old, _ = cache.put_stream('a', [self.body])
+        old_pyramid = pyramid(old)
+        new, _ = cache.put_stream('a', [self.body[::-1]])
+        new_pyramid = pyramid(new)
+        # Replacing a key's content frees the old object, and eviction frees the new one
+        self.assertFalse(os.path.exists(old_pyramid))
+        self.assertFalse(os.path.exists(cache.object_path(old)))
+        cache.put_stream('b', [self.body[1:]])
+        self.assertFalse(os.path.exists(new_pyramid))
+        self.assertFalse(os.path.exists(cache.object_path(new)))
+        self.assertEqual(list(cache.index), ['b'])
+
+    def test_resumes_dropped_download_with_range(self):
+        self.start(cut={'/cut'})
+
+        digest, path = self.engine.fetch(self.server.url('/cut'))
+
+        self.assertEqual(digest, self.digest)
+        self.assertEqual(herman2.file_sha256(path), self.digest)
+        (_, first_range, _), (_, retry_range, if_range) = self.server.requests
+        self.assertIsNone(first_range)
+        # Only the tail after the bytes that made it to disk is fetched again
+        self.assertEqual(retry_range, f"bytes={len(self.body) // 2}-")
+        self.assertEqual(if_range, self.server.etag)
+        self.assertEqual(os.listdir(self.cache.partial_dir), [])
+
+
+
+def http_error(status, retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return requests.HTTPError(f"{status}", response=response)
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_classifies_transient_and_permanent_errors(self):
+        policy = herman2.RetryPolicy()
+        for error in (http_error(429), http_error(500), http_error(503), requests.Timeout(),
+                      requests.ConnectionError(), requests.exceptions.ChunkedEncodingError(),
+                      herman2.CircuitOpenError("example.com", 5)):
+            self.assertTrue(policy.is_retryable(error), error)
+        for error in (http_error(403), http_error(404), requests.HTTPError("no response"),
+                      OSError("disk full"), ValueError("not an image")):
+            self.assertFalse(policy.is_retryable(error), error)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        policy = herman2.RetryPolicy(base_delay=1.0, max_delay=10.0, jitter=0.0)
+        self.assertEqual([policy.delay(attempt) for attempt in range(6)], [1.0, 2.0, 4.0, 8.0, 10.0, 10.0])
+
+    def test_jitter_only_shortens_the_delay(self):
+        policy = herman2.RetryPolicy(base_delay=4.0, jitter=0.5)
+        delays = [policy.delay(0) for _ in range(200)]
+        self.assertTrue(all(2.0 <= delay <= 4.0 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_retry_after_is_a_capped_lower_bound(self):
+        policy = herman2.RetryPolicy(base_delay=1.0, max_delay=30.0, jitter=0.0)
+        self.assertEqual(policy.delay(0, http_error(429, "12")), 12.0)
+        self.assertEqual(policy.delay(4, http_error(429, "1")), 16.0)
+        self.assertEqual(policy.delay(0, http_error(503, "3600")), 30.0)
+        # HTTP-date values aren't parsed and fall back to the backoff
+        self.assertEqual(policy.delay(0, http_error(503, "Wed, 21 Oct 2026 07:28:00 GMT")), 1.0)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(herman2.time, 'monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = herman2.CircuitBreaker(threshold=3, cooldown=30)
+
+    def fail(self, times, host="example.com"):
+        with mock.patch('builtins.print'):
+            for _ in range(times):
+                self.breaker.record_failure(host)
+
+    def test_trips_after_threshold_consecutive_failures(self):
+        self.fail(2)
+        self.breaker.check("example.com")
+        self.fail(1)
+        with self.assertRaises(herman2.CircuitOpenError) as raised:
+            self.breaker.check("example.com")
+        self.assertEqual(raised.exception.retry_in, 30)
+        self.assertEqual(self.breaker.trips, 1)
+        # Other hosts are unaffected
+        self.breaker.check("other.example.com")
+
+    def test_reopens_on_the_first_failure_after_cooldown(self):
+        self.fail(3)
+        self.now += 10
+        self.assertEqual(self.breaker.wait_time("example.com"), 20)
+        self.now += 20
+        self.breaker.check("example.com")
+        self.fail(1)
+        self.assertEqual(self.breaker.wait_time("example.com"), 30)
+        self.assertEqual(self.breaker.trips, 2)
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        self.breaker.record_success("example.com")
+        self.fail(2)
+        self.breaker.check("example.com")
+        self.assertEqual(self.breaker.trips, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()